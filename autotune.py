@@ -0,0 +1,205 @@
+"""
+Encoder autotuning from a short calibration encode.
+
+A few seconds from the middle of a real input are encoded with each candidate set of
+MPEG-2 encoder settings. The speed and the SSIM/PSNR against the source are measured, and
+the fastest candidate that meets the quality target is saved as this host's profile.
+Every later encode on the host appends the profile's arguments (see encoder.dvd_encode_args):
+
+    python autotune.py run sample_input.mp4 [--target-ssim 0.95]
+    python autotune.py show
+    python autotune.py clear
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+from typing import Optional
+
+import typer
+from loguru import logger
+
+from encoder import ENCODER_PROFILE_PATH, dvd_encode_args, host_key, load_encoder_profile
+from probe import get_duration
+
+app = typer.Typer()
+
+CALIBRATION_DIR = "autotune_workdir"
+SAMPLE_SECONDS = 6.0
+# ffmpeg's MPEG-2 encoder gains nothing from more slice threads than this
+MAX_ENCODER_THREADS = 16
+# With no explicit target, accept candidates this close to the best SSIM measured
+DEFAULT_SSIM_TOLERANCE = 0.005
+
+# (name, mpeg2video options), roughly from fastest to slowest
+CANDIDATES = [
+    ("fast", ["-mbd", "simple", "-trellis", "0", "-dia_size", "0"]),
+    ("default", []),
+    ("bits", ["-mbd", "bits"]),
+    ("rd", ["-mbd", "rd"]),
+    ("rd_trellis", ["-mbd", "rd", "-trellis", "1", "-cmp", "2", "-subcmp", "2"]),
+    ("hq", ["-mbd", "rd", "-trellis", "2", "-cmp", "2", "-subcmp", "2", "-dia_size", "2", "-last_pred", "2"]),
+]
+
+
+def extract_sample(file_path, sample_path, seconds=SAMPLE_SECONDS):
+    """
+    Cut a lossless sample from the middle of file_path, already scaled to DVD geometry and frame rate,
+    so candidate encodes only pay for the encoder and quality is measured against the exact frames encoded.
+    """
+    duration = get_duration(file_path)
+    start = max(0.0, duration / 2 - seconds / 2)
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", "-ss", f"{start:.3f}", "-t", f"{seconds:.3f}", "-i", file_path,
+        "-an", "-sn", "-vf", "scale=720:480,fps=30000/1001,format=yuv420p", "-c:v", "ffv1", sample_path,
+    ]
+    subprocess.run(cmd, check=True)
+    return min(seconds, duration)
+
+
+def measure_quality(encoded_path, sample_path):
+    """SSIM (All) and PSNR (average) of encoded_path against sample_path."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", encoded_path, "-i", sample_path,
+        "-lavfi", "[0:v]split[d0][d1];[1:v]split[r0][r1];[d0][r0]ssim;[d1][r1]psnr", "-f", "null", "-",
+    ]
+    output = subprocess.run(cmd, capture_output=True, text=True, check=True).stderr
+    ssim = re.search(r"SSIM .*All:([0-9.]+)", output)
+    psnr = re.search(r"PSNR .*average:([0-9.]+|inf)", output)
+    return float(ssim.group(1)) if ssim else None, float(psnr.group(1)) if psnr else None
+
+
+def run_candidate(name, options, sample_path, sample_seconds, workdir):
+    """Encode the sample with one candidate and return its result record."""
+    threads = min(os.cpu_count() or 1, MAX_ENCODER_THREADS)
+    args = options + ["-threads", str(threads)]
+    encoded_path = os.path.join(workdir, f"{name}.m2v")
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", sample_path] + dvd_encode_args(tuned=False) + args + ["-f", "mpeg2video", encoded_path]
+    start = time.monotonic()
+    subprocess.run(cmd, check=True)
+    wall = time.monotonic() - start
+    ssim, psnr = measure_quality(encoded_path, sample_path)
+    os.remove(encoded_path)
+    result = {"name": name, "args": args, "wall_s": round(wall, 3), "speed": round(sample_seconds / wall, 2), "ssim": ssim, "psnr": psnr}
+    logger.info(f"  {name:11s} {result['speed']:6.2f}x realtime  SSIM {ssim}  PSNR {psnr} dB")
+    return result
+
+
+def choose_profile(results, target_ssim=None):
+    """The fastest result whose SSIM meets target_ssim (default: within DEFAULT_SSIM_TOLERANCE of the best)."""
+    measured = [r for r in results if r["ssim"] is not None]
+    if not measured:
+        return None
+    if target_ssim is None:
+        target_ssim = max(r["ssim"] for r in measured) - DEFAULT_SSIM_TOLERANCE
+    passing = [r for r in measured if r["ssim"] >= target_ssim]
+    if not passing:
+        logger.warning(f"No candidate reached SSIM {target_ssim:.4f}, using the highest quality one.")
+        return max(measured, key=lambda r: r["ssim"])
+    return max(passing, key=lambda r: r["speed"])
+
+
+def save_profile(profile, profile_path=ENCODER_PROFILE_PATH):
+    """Store profile as this host's entry, keeping the other hosts' profiles."""
+    try:
+        with open(profile_path, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    except (OSError, ValueError):
+        profiles = {}
+    profiles[host_key()] = profile
+    os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+    tmp_path = f"{profile_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, profile_path)
+
+
+def calibrate(file_path, target_ssim=None, seconds=SAMPLE_SECONDS, save=True):
+    """
+    Run the calibration encodes on a sample of file_path and pick this host's encoder profile.
+    target_ssim: Minimum SSIM for a candidate to qualify (None: close to the best candidate)
+    seconds: Length of the sample
+    save: Store the chosen profile for later jobs on this host
+
+    Returns the chosen profile, or None if calibration failed.
+    """
+    workdir = os.path.abspath(CALIBRATION_DIR)
+    if os.path.exists(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(workdir)
+    sample_path = os.path.join(workdir, "sample.mkv")
+    try:
+        logger.info(f"Extracting a {seconds:.0f}s calibration sample from {file_path}...")
+        sample_seconds = extract_sample(file_path, sample_path, seconds)
+        logger.info(f"Calibrating {len(CANDIDATES)} encoder candidates on {host_key()}:")
+        results = [run_candidate(name, options, sample_path, sample_seconds, workdir) for name, options in CANDIDATES]
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Calibration failed: {e}")
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    best = choose_profile(results, target_ssim)
+    if best is None:
+        logger.error("ffmpeg reported no quality metrics, keeping the current settings.")
+        return None
+    profile = dict(
+        best,
+        host=host_key(),
+        input=os.path.basename(file_path),
+        target_ssim=target_ssim,
+        created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        candidates=results,
+    )
+    logger.info(f"Chosen profile: {best['name']} ({best['speed']}x realtime, SSIM {best['ssim']}): {' '.join(best['args'])}")
+    if save:
+        save_profile(profile)
+        logger.info(f"Saved encoder profile to {ENCODER_PROFILE_PATH}")
+    return profile
+
+
+@app.command()
+def run(
+    file_path: str = typer.Argument(..., help="Input video to take the calibration sample from"),
+    target_ssim: Optional[float] = typer.Option(None, "--target-ssim", help="Minimum SSIM (default: within 0.005 of the best candidate)"),
+    seconds: float = typer.Option(SAMPLE_SECONDS, "--seconds", help="Length of the calibration sample"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report the choice without saving it"),
+):
+    """Calibrate the encoder on this host and save the chosen profile."""
+    if calibrate(file_path, target_ssim=target_ssim, seconds=seconds, save=not dry_run) is None:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def show():
+    """Show the encoder profile saved for this host."""
+    profile = load_encoder_profile()
+    if not profile:
+        logger.info(f"No encoder profile for {host_key()}, using the default settings.")
+        return
+    logger.info(
+        f"{profile['host']}: {profile['name']} ({profile['speed']}x realtime, SSIM {profile['ssim']}, "
+        f"tuned {profile['created']} on {profile['input']}): {' '.join(profile['args'])}"
+    )
+
+
+@app.command()
+def clear():
+    """Forget the encoder profile of this host."""
+    try:
+        with open(ENCODER_PROFILE_PATH, "r", encoding="utf-8") as f:
+            profiles = json.load(f)
+    except (OSError, ValueError):
+        profiles = {}
+    if profiles.pop(host_key(), None) is None:
+        logger.info("No encoder profile to clear.")
+        return
+    with open(ENCODER_PROFILE_PATH, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    logger.info(f"Cleared the encoder profile of {host_key()}.")
+
+
+if __name__ == "__main__":
+    app()
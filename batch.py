@@ -0,0 +1,152 @@
+import os
+import platform
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from loguru import logger
+
+BATCH_WORKROOT = "dvd_batch"
+
+
+def read_manifest(manifest_path):
+    """
+    Read a batch manifest: one input video path per line.
+    Blank lines and lines starting with '#' are ignored.
+    Relative paths are resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    file_paths = []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not os.path.isabs(line):
+                line = os.path.join(base_dir, line)
+            file_paths.append(line)
+    return file_paths
+
+
+def plan_jobs(file_paths, output_dir, workroot=BATCH_WORKROOT, use_cache=True, resume=False):
+    """
+    Build one job description per input video.
+    Every job gets its own scratch directory and a unique ISO name in output_dir.
+    """
+    jobs = []
+    used_names = set()
+    for index, file_path in enumerate(file_paths, start=1):
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        iso_name = f"{stem}.iso"
+        if iso_name in used_names:
+            iso_name = f"{stem}_{index:03d}.iso"
+        used_names.add(iso_name)
+        jobs.append(
+            {
+                "index": index,
+                "file_path": os.path.abspath(file_path),
+                "iso_output": os.path.abspath(os.path.join(output_dir, iso_name)),
+                "workdir": os.path.abspath(os.path.join(workroot, f"job_{index:03d}_{stem}")),
+                "use_cache": use_cache,
+                "resume": resume,
+                "metrics_path": os.path.abspath(os.path.join(output_dir, f"{os.path.splitext(iso_name)[0]}.metrics.jsonl")),
+            }
+        )
+    return jobs
+
+
+def run_job(job):
+    """Run a single batch job in a worker process and return its result record."""
+    start = time.monotonic()
+    result = dict(job, status="failed", error=None, iso_size=0)
+    try:
+        if platform.system() == "Windows":
+            from windows import run_for_windows
+
+            iso_path = run_for_windows(
+                burn=False,
+                iso="dvd.xml",
+                burn_drive=None,
+                iso_output=job["iso_output"],
+                file_path=job["file_path"],
+                workdir=job["workdir"],
+                metrics_path=job["metrics_path"],
+            )
+        else:
+            from linux import run_for_linux
+
+            iso_path = run_for_linux(
+                burn=False,
+                iso="dvd.xml",
+                burn_drive=None,
+                iso_output=job["iso_output"],
+                file_path=job["file_path"],
+                workdir=job["workdir"],
+                use_cache=job["use_cache"],
+                metrics_path=job["metrics_path"],
+                resume=job["resume"],
+            )
+        if iso_path and os.path.exists(iso_path):
+            result["status"] = "ok"
+            result["iso_size"] = os.path.getsize(iso_path)
+            shutil.rmtree(job["workdir"], ignore_errors=True)
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def run_batch(file_paths, output_dir=".", max_workers=None, workroot=BATCH_WORKROOT, use_cache=True, resume=False):
+    """
+    Build one ISO per input video, running the jobs on a process pool.
+    file_paths: List of input video paths
+    output_dir: Directory that receives the ISO files
+    max_workers: Number of concurrent jobs (defaults to the number of CPU cores)
+    workroot: Parent directory of the per-job scratch directories
+    use_cache: Reuse cached transcodes on Linux (see cache.py)
+    resume: Continue failed jobs from their kept workdirs on Linux (see manifest.py)
+
+    Returns the list of job results in input order.
+    """
+    if not file_paths:
+        logger.warning("Batch is empty, nothing to do.")
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = plan_jobs(file_paths, output_dir, workroot=workroot, use_cache=use_cache, resume=resume)
+    max_workers = max_workers or os.cpu_count() or 1
+    max_workers = min(max_workers, len(jobs))
+    logger.info(f"Starting batch of {len(jobs)} jobs with {max_workers} workers...")
+
+    start = time.monotonic()
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            logger.info(
+                f"[{result['index']}/{len(jobs)}] {result['status']}: "
+                f"{os.path.basename(result['file_path'])} in {result['seconds']:.1f}s"
+            )
+            results.append(result)
+    elapsed = time.monotonic() - start
+
+    results.sort(key=lambda r: r["index"])
+    print_batch_summary(results, elapsed)
+    return results
+
+
+def print_batch_summary(results, elapsed):
+    """Log a per-job table and the total throughput of the batch."""
+    logger.info("Batch summary:")
+    for r in results:
+        line = f"  #{r['index']:03d} {r['status']:6s} {r['seconds']:8.1f}s  {r['iso_size'] / 1e6:9.1f} MB  {r['file_path']}"
+        if r["error"]:
+            line += f"  ({r['error']})"
+        logger.info(line)
+    ok = [r for r in results if r["status"] == "ok"]
+    input_bytes = sum(os.path.getsize(r["file_path"]) for r in ok if os.path.exists(r["file_path"]))
+    elapsed = max(elapsed, 1e-6)
+    logger.info(
+        f"{len(ok)}/{len(results)} jobs succeeded in {elapsed:.1f}s "
+        f"({len(ok) / elapsed * 3600:.1f} jobs/hour, {input_bytes / 1e6 / elapsed:.2f} MB/s input)"
+    )
@@ -0,0 +1,224 @@
+"""
+Reproducible benchmark for the Linux DVD build pipeline.
+
+Synthetic inputs are generated locally with ffmpeg's lavfi test sources, run through
+run_for_linux, and the per-stage metrics are collected into a JSON results file:
+
+    python benchmark.py run --output results.json
+    python benchmark.py compare baseline.json results.json
+"""
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+import typer
+from loguru import logger
+
+from metrics import path_size
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+app = typer.Typer()
+
+BENCH_DIR = "bench_workdir"
+SCRATCH_POLL_INTERVAL = 0.5
+
+# (name, duration seconds, resolution, frame rate)
+DEFAULT_CASES = [
+    ("sd30_10s", 10, "720x480", "30000/1001"),
+    ("hd24_30s", 30, "1280x720", "24"),
+    ("hd30_30s", 30, "1920x1080", "30000/1001"),
+    ("hd60_30s", 30, "1920x1080", "60"),
+    ("sd30_120s", 120, "720x480", "30000/1001"),
+]
+QUICK_CASES = DEFAULT_CASES[:2]
+
+# Metrics where a larger value is a regression; everything else in a case is "higher is better"
+LOWER_IS_BETTER = ("wall_s", "cpu_s", "peak_scratch_bytes", "peak_rss_kb")
+
+
+def generate_input(name, duration, size, rate, input_dir):
+    """Create (once) a synthetic test video with moving test pattern and a sine tone."""
+    path = os.path.join(input_dir, f"{name}.mp4")
+    if os.path.exists(path):
+        return path
+    os.makedirs(input_dir, exist_ok=True)
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={rate}:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", path,
+    ]
+    logger.info(f"Generating {path}...")
+    subprocess.run(cmd, check=True)
+    return path
+
+
+def _watch_scratch(workdir, stop, peak):
+    while not stop.is_set():
+        peak[0] = max(peak[0], path_size(workdir))
+        stop.wait(SCRATCH_POLL_INTERVAL)
+
+
+def _run_case_in_child(case):
+    """Runs in a fresh process so the child-process RSS high-water mark belongs to this case."""
+    from linux import run_for_linux
+
+    workdir = os.path.abspath(os.path.join(BENCH_DIR, "work", case["name"]))
+    metrics_path = os.path.join(BENCH_DIR, "metrics", f"{case['name']}.jsonl")
+    if os.path.exists(metrics_path):
+        os.remove(metrics_path)
+    iso_output = os.path.abspath(os.path.join(BENCH_DIR, "work", f"{case['name']}.iso"))
+
+    stop = threading.Event()
+    peak = [0]
+    watcher = threading.Thread(target=_watch_scratch, args=(workdir, stop, peak), daemon=True)
+    watcher.start()
+    start = time.monotonic()
+    try:
+        iso_path = run_for_linux(
+            burn=False,
+            iso="dvd.xml",
+            burn_drive=None,
+            iso_output=iso_output,
+            file_path=case["file_path"],
+            workdir=workdir,
+            use_cache=False,
+            native_iso=case["native_iso"],
+            metrics_path=metrics_path,
+        )
+    finally:
+        stop.set()
+        watcher.join()
+    total = time.monotonic() - start
+
+    stages = {}
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["event"] == "stage":
+                stages[record["stage"]] = {k: record[k] for k in ("wall_s", "cpu_s", "bytes", "mb_per_s")}
+    encode = stages.get("encode", {})
+    result = {
+        "name": case["name"],
+        "ok": bool(iso_path),
+        "wall_s": round(total, 3),
+        "realtime_factor": round(case["duration"] / encode["wall_s"], 3) if encode.get("wall_s") else None,
+        "peak_scratch_bytes": max(peak[0], path_size(iso_output)),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss if resource else None,
+        "stages": stages,
+    }
+    shutil.rmtree(workdir, ignore_errors=True)
+    if os.path.exists(iso_output):
+        os.remove(iso_output)
+    return result
+
+
+def ffmpeg_version():
+    try:
+        out = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout
+        return out.splitlines()[0] if out else None
+    except FileNotFoundError:
+        return None
+
+
+@app.command()
+def run(
+    output: str = typer.Option("bench_results.json", "--output", help="Where to write the results JSON"),
+    quick: bool = typer.Option(False, "--quick", help="Only run the two smallest cases"),
+    case: Optional[List[str]] = typer.Option(None, "--case", help="Run only the named case (repeatable)"),
+    native_iso: bool = typer.Option(False, "--native-iso", help="Master ISOs with the built-in writer"),
+):
+    """Generate the synthetic inputs and benchmark every case."""
+    cases = QUICK_CASES if quick else DEFAULT_CASES
+    if case:
+        cases = [c for c in DEFAULT_CASES if c[0] in case]
+    input_dir = os.path.join(BENCH_DIR, "inputs")
+    results = []
+    # One fresh process per case, so RUSAGE_CHILDREN's max RSS is not carried over
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for name, duration, size, rate in cases:
+            file_path = os.path.abspath(generate_input(name, duration, size, rate, input_dir))
+            logger.info(f"Benchmarking {name} ({duration}s {size}@{rate})...")
+            spec = {"name": name, "duration": duration, "file_path": file_path, "native_iso": native_iso}
+            result = pool.apply(_run_case_in_child, (spec,))
+            result.update(duration=duration, size=size, rate=rate, input_bytes=os.path.getsize(file_path))
+            logger.info(
+                f"{name}: {result['wall_s']:.1f}s total, {result['realtime_factor']}x realtime, "
+                f"peak scratch {result['peak_scratch_bytes'] / 1e6:.1f} MB"
+            )
+            results.append(result)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "ffmpeg": ffmpeg_version(),
+        "cases": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote {output}")
+
+
+def _flatten(case):
+    values = {k: case[k] for k in ("wall_s", "realtime_factor", "peak_scratch_bytes", "peak_rss_kb") if case.get(k) is not None}
+    for stage, record in case.get("stages", {}).items():
+        for key in ("wall_s", "mb_per_s"):
+            if record.get(key) is not None:
+                values[f"{stage}.{key}"] = record[key]
+    return values
+
+
+def find_regressions(baseline, current, threshold):
+    """Return (case, metric, old, new, change) tuples that got worse by more than threshold."""
+    old_cases = {c["name"]: c for c in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        if case["name"] not in old_cases:
+            continue
+        old_values = _flatten(old_cases[case["name"]])
+        for metric, new in _flatten(case).items():
+            old = old_values.get(metric)
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric.split(".")[-1] in LOWER_IS_BETTER else change < -threshold
+            if worse:
+                regressions.append((case["name"], metric, old, new, change))
+    return regressions
+
+
+@app.command()
+def compare(
+    baseline: str = typer.Argument(..., help="Results JSON of the reference run"),
+    current: str = typer.Argument(..., help="Results JSON of the new run"),
+    threshold: float = typer.Option(0.10, "--threshold", help="Relative change that counts as a regression"),
+):
+    """Flag metrics that regressed between two benchmark runs."""
+    with open(baseline, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(current, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("ffmpeg") != new.get("ffmpeg"):
+        logger.warning(f"ffmpeg version changed: {old.get('ffmpeg')} -> {new.get('ffmpeg')}")
+    regressions = find_regressions(old, new, threshold)
+    for name, metric, old_value, new_value, change in regressions:
+        logger.warning(f"REGRESSION {name} {metric}: {old_value} -> {new_value} ({change:+.1%})")
+    if regressions:
+        raise typer.Exit(code=1)
+    logger.info("No regressions found.")
+
+
+if __name__ == "__main__":
+    app()
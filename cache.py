@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from loguru import logger
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simplified-dvd", "transcode")
+DEFAULT_MAX_BYTES = 20 * 1024**3
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def sha256_file(file_path):
+    """Hex SHA-256 of a file's content, read in large chunks."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def link_or_copy(src, dst):
+    """Hard-link src to dst when both live on the same filesystem, copy otherwise."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class TranscodeCache:
+    """
+    Persistent cache of transcoded output.mpg files.
+    Entries are keyed by a hash of the input content and the exact ffmpeg parameters,
+    and the least recently used entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hash_index_path = os.path.join(cache_dir, "hashes.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mpg")
+
+    def _content_hash(self, file_path):
+        # Hashing a multi-GB input is not free, so remember the digest per (path, size, mtime)
+        st = os.stat(file_path)
+        stat_key = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+        try:
+            with open(self.hash_index_path, "r", encoding="utf-8") as f:
+                hash_index = json.load(f)
+        except (OSError, ValueError):
+            hash_index = {}
+        if stat_key in hash_index:
+            return hash_index[stat_key]
+
+        logger.info(f"Hashing {file_path} for the transcode cache...")
+        digest = sha256_file(file_path)
+
+        hash_index[stat_key] = digest
+        tmp_path = f"{self.hash_index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(hash_index, f)
+        os.replace(tmp_path, self.hash_index_path)
+        return digest
+
+    def key(self, file_path, ffmpeg_args):
+        """Cache key for encoding file_path with the given ffmpeg output arguments."""
+        h = hashlib.sha256()
+        h.update(self._content_hash(file_path).encode("ascii"))
+        h.update(b"\0")
+        h.update("\0".join(ffmpeg_args).encode("utf-8"))
+        return h.hexdigest()
+
+    def fetch(self, key, dest):
+        """Place the cached artifact for key at dest. Returns True on a cache hit."""
+        entry = self._entry_path(key)
+        if not os.path.exists(entry):
+            return False
+        # Bump the mtime so LRU eviction sees this entry as recently used
+        os.utime(entry)
+        if os.path.exists(dest):
+            os.remove(dest)
+        link_or_copy(entry, dest)
+        return True
+
+    def store(self, key, src):
+        """Add src to the cache under key, then evict old entries if over the size cap."""
+        entry = self._entry_path(key)
+        tmp_path = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        link_or_copy(src, tmp_path)
+        os.replace(tmp_path, entry)
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mpg"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting {os.path.basename(path)} from the transcode cache")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
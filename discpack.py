@@ -0,0 +1,222 @@
+"""
+Multi-title mode: pack many videos onto the fewest discs.
+
+Every input is probed for its duration and the titles are bin-packed onto DVD-5 or DVD-9 discs
+(first-fit decreasing, sized at the lowest acceptable bitrate). The load is then balanced across
+that many discs, and each disc gets the highest video bitrate that still fits all of its titles.
+Every disc is authored as one multi-title DVD and mastered into its own ISO.
+"""
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from cache import TranscodeCache
+from encoder import AUDIO_BITRATE, DEFAULT_CHAPTER_INTERVAL, MUX_OVERHEAD, dvd_encode_args, estimate_mpeg_bytes, ffmpeg_dvd_command, plan_chapters
+from isowriter import find_iso_tool, write_dvd_iso
+from linux import create_dvd_xml, dvdauthor_command, iso_command
+from metrics import PipelineMetrics, path_size, run_ffmpeg_with_progress
+from probe import get_duration, get_keyframes
+
+# Raw capacities in bytes
+DISC_SIZES = {"dvd5": 4_700_000_000, "dvd9": 8_540_000_000}
+# IFO/BUP files and the ISO9660/UDF structures
+DISC_RESERVE_BYTES = 32 * 1024 * 1024
+# Below this MPEG-2 at 720x480 falls apart; above it the 9.8 Mbit/s peak leaves no VBR headroom
+MIN_VIDEO_BITRATE = 1_500_000
+MAX_VIDEO_BITRATE = 8_000_000
+# DVD-Video allows at most 99 titles per disc
+MAX_TITLES_PER_DISC = 99
+PACK_WORKROOT = "dvd_pack"
+
+
+def title_bytes(duration, video_bitrate):
+    """Expected size of a title of duration seconds at video_bitrate."""
+    return estimate_mpeg_bytes(duration, video_bitrate)
+
+
+def fill_bitrate(durations, capacity):
+    """Highest video bitrate (within MIN/MAX_VIDEO_BITRATE) at which titles of these durations fit capacity."""
+    usable = capacity - DISC_RESERVE_BYTES
+    total = sum(durations)
+    if total <= 0:
+        return MAX_VIDEO_BITRATE
+    bitrate = usable * 8 / MUX_OVERHEAD / total - AUDIO_BITRATE
+    return int(max(MIN_VIDEO_BITRATE, min(MAX_VIDEO_BITRATE, bitrate)))
+
+
+def plan_discs(durations, capacity):
+    """
+    Pack titles onto the fewest discs.
+    durations: Title durations in seconds, in input order
+    capacity: Disc size in bytes
+
+    Returns a list of discs, each {"titles": [title indexes in input order], "video_bitrate": bits/s}.
+    Raises ValueError for a title that does not fit on an empty disc even at MIN_VIDEO_BITRATE.
+    """
+    usable = capacity - DISC_RESERVE_BYTES
+    bins = []
+    for index in sorted(range(len(durations)), key=lambda i: durations[i], reverse=True):
+        size = title_bytes(durations[index], MIN_VIDEO_BITRATE)
+        if size > usable:
+            raise ValueError(f"Title {index + 1} ({durations[index] / 60:.0f} min) does not fit on one disc")
+        for disc in bins:
+            if disc["bytes"] + size <= usable and len(disc["titles"]) < MAX_TITLES_PER_DISC:
+                disc["titles"].append(index)
+                disc["bytes"] += size
+                break
+        else:
+            bins.append({"titles": [index], "bytes": size})
+
+    # First-fit leaves the last discs nearly empty; with the disc count fixed, spread the titles
+    # longest-first onto the least loaded disc so every disc gets a similar bitrate
+    balanced = [{"titles": [], "bytes": 0.0} for _ in bins]
+    for index in sorted(range(len(durations)), key=lambda i: durations[i], reverse=True):
+        disc = min(balanced, key=lambda d: d["bytes"])
+        disc["titles"].append(index)
+        disc["bytes"] += title_bytes(durations[index], MIN_VIDEO_BITRATE)
+    if all(d["bytes"] <= usable and len(d["titles"]) <= MAX_TITLES_PER_DISC for d in balanced):
+        bins = balanced
+
+    discs = []
+    for disc in bins:
+        titles = sorted(disc["titles"])
+        discs.append({"titles": titles, "video_bitrate": fill_bitrate([durations[i] for i in titles], capacity)})
+    # Keep the discs in the order their first title appears in the input
+    discs.sort(key=lambda d: d["titles"][0])
+    return discs
+
+
+def encode_title(file_path, output_mpg, video_bitrate, duration, metrics, stage, use_cache):
+    """Encode one title at video_bitrate, through the transcode cache. Returns True on success."""
+    cache = TranscodeCache() if use_cache else None
+    if cache:
+        cache_key = cache.key(file_path, dvd_encode_args(video_bitrate))
+        if cache.fetch(cache_key, output_mpg):
+            logger.info(f"Transcode cache hit for {os.path.basename(file_path)}, skipping ffmpeg.")
+            return True
+    with metrics.stage(stage, output_path=output_mpg) as info:
+        code = run_ffmpeg_with_progress(
+            ffmpeg_dvd_command(file_path, output_mpg, video_bitrate), metrics, stage=stage, duration=duration
+        )
+        if code != 0:
+            info["status"] = "failed"
+            logger.error(f"ffmpeg failed to encode {file_path}!")
+            return False
+    if cache:
+        cache.store(cache_key, output_mpg)
+    return True
+
+
+def build_disc(disc, file_paths, durations, workdir, iso_output, capacity, use_cache=True, jobs=2, native_iso=False, chapter_interval=DEFAULT_CHAPTER_INTERVAL):
+    """
+    Encode, author and master one packed disc.
+    disc: Entry from plan_discs
+    file_paths, durations: All inputs and their durations (indexed by the disc's titles)
+    workdir: Scratch directory for this disc
+    iso_output: ISO to write
+    jobs: Number of titles encoded at once
+    chapter_interval: Seconds between automatic chapter marks, 0 for none
+
+    Returns the ISO path, or None on failure.
+    """
+    if os.path.exists(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(workdir)
+    metrics = PipelineMetrics(os.path.splitext(iso_output)[0] + ".metrics.jsonl", job=os.path.basename(iso_output))
+    bitrate = disc["video_bitrate"]
+    title_files = [f"title_{n:02d}.mpg" for n in range(1, len(disc["titles"]) + 1)]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [
+            executor.submit(
+                encode_title, file_paths[index], os.path.join(workdir, name), bitrate,
+                durations[index], metrics, f"encode_t{n:02d}", use_cache,
+            )
+            for n, (index, name) in enumerate(zip(disc["titles"], title_files), start=1)
+        ]
+        if not all(f.result() for f in futures):
+            return None
+
+    # Keyframe maps come from the probe index, so chapters cost nothing after the first run
+    chapters = [
+        plan_chapters(get_keyframes(file_paths[index]), durations[index], interval=chapter_interval) if chapter_interval else None
+        for index in disc["titles"]
+    ]
+    create_dvd_xml(os.path.join(workdir, "dvd.xml"), titles=title_files, chapters=chapters)
+    os.makedirs(os.path.join(workdir, "DVD"))
+    with metrics.stage("author", output_path=os.path.join(workdir, "DVD")):
+        subprocess.run(dvdauthor_command(), check=True, cwd=workdir)
+    for name in title_files:
+        os.remove(os.path.join(workdir, name))
+    authored = path_size(os.path.join(workdir, "DVD"))
+    if authored > capacity - DISC_RESERVE_BYTES:
+        logger.warning(f"{os.path.basename(iso_output)}: authored size {authored / 1e9:.2f} GB overshoots the disc")
+
+    iso_tool = None if native_iso else find_iso_tool()
+    with metrics.stage("master", output_path=iso_output):
+        if iso_tool:
+            subprocess.run(iso_command(iso_tool, iso_output), check=True, cwd=workdir)
+        else:
+            write_dvd_iso(os.path.join(workdir, "DVD"), iso_output)
+    metrics.summary()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return iso_output
+
+
+def run_packed(file_paths, output_dir=".", disc_size="dvd5", use_cache=True, jobs=2, native_iso=False, workroot=PACK_WORKROOT, chapter_interval=DEFAULT_CHAPTER_INTERVAL):
+    """
+    Pack file_paths onto the fewest discs and build one multi-title ISO per disc.
+    file_paths: List of input video paths
+    output_dir: Directory that receives disc_01.iso, disc_02.iso, ...
+    disc_size: Key of DISC_SIZES
+    use_cache: Reuse cached transcodes (see cache.py)
+    jobs: Number of titles encoded at once on each disc
+    workroot: Parent directory of the per-disc scratch directories
+    chapter_interval: Seconds between automatic chapter marks, 0 for none
+
+    Returns the list of ISO paths (None for discs that failed).
+    """
+    if not file_paths:
+        logger.warning("Nothing to pack.")
+        return []
+    os.environ["VIDEO_FORMAT"] = "NTSC"
+    os.makedirs(output_dir, exist_ok=True)
+    capacity = DISC_SIZES[disc_size]
+    durations = [get_duration(path) for path in file_paths]
+    try:
+        discs = plan_discs(durations, capacity)
+    except ValueError as e:
+        logger.error(f"{e}, use --disc-size dvd9 or split the input.")
+        return []
+
+    total = sum(durations)
+    logger.info(f"Packing {len(file_paths)} titles ({total / 3600:.1f} h) onto {len(discs)} {disc_size} disc(s):")
+    for number, disc in enumerate(discs, start=1):
+        seconds = sum(durations[i] for i in disc["titles"])
+        logger.info(
+            f"  disc {number:02d}: {len(disc['titles'])} titles, {seconds / 60:.0f} min at "
+            f"{disc['video_bitrate'] // 1000} kbit/s, ~{title_bytes(seconds, disc['video_bitrate']) / 1e9:.2f} GB"
+        )
+        for index in disc["titles"]:
+            logger.info(f"      {os.path.basename(file_paths[index])}")
+
+    results = []
+    start = time.monotonic()
+    for number, disc in enumerate(discs, start=1):
+        iso_output = os.path.abspath(os.path.join(output_dir, f"disc_{number:02d}.iso"))
+        workdir = os.path.abspath(os.path.join(workroot, f"disc_{number:02d}"))
+        logger.info(f"Building disc {number}/{len(discs)}...")
+        try:
+            iso_path = build_disc(
+                disc, file_paths, durations, workdir, iso_output, capacity, use_cache, jobs, native_iso, chapter_interval
+            )
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Disc {number} failed: {e}")
+            iso_path = None
+        results.append(iso_path)
+    logger.info(f"{sum(1 for r in results if r)}/{len(discs)} discs built in {time.monotonic() - start:.0f}s")
+    return results
@@ -0,0 +1,127 @@
+"""
+Optical drive discovery with a cache that is invalidated when devices change.
+
+    python drives.py [--refresh]
+
+On Linux the drives are read from sysfs (block devices whose SCSI type is 5, i.e. CD/DVD-ROM);
+on Windows the WMI/drive-letter scan in windows.py is used. Either way the result is cached in
+~/.cache/simplified-dvd/drives.json together with a cheap signature of the device set: the sysfs
+block device names plus the mtime of udev's database on Linux, the logical drive bitmask on Windows.
+A launch only rescans when the signature has changed.
+"""
+import json
+import os
+import sys
+
+from loguru import logger
+
+DRIVE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "simplified-dvd", "drives.json")
+SYSFS_BLOCK = "/sys/class/block"
+# udev rewrites a device's entry here on every add/remove/change event (including media changes)
+UDEV_DATA = "/run/udev/data"
+# SCSI peripheral device type of CD/DVD drives
+SCSI_TYPE_ROM = "5"
+
+
+def _read_sysfs(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def sysfs_optical_drives(sysfs_block=SYSFS_BLOCK):
+    """
+    Optical drives listed in sysfs, in the format of windows.get_optical_drives:
+    [{'drive': '/dev/sr0', 'media_loaded': True, 'name': 'HL-DT-ST DVDRAM GH24NSD1'}, ...]
+    """
+    drives = []
+    try:
+        names = sorted(os.listdir(sysfs_block))
+    except OSError:
+        return drives
+    for name in names:
+        device = os.path.join(sysfs_block, name, "device")
+        if _read_sysfs(os.path.join(device, "type")) != SCSI_TYPE_ROM:
+            continue
+        model = " ".join(filter(None, (_read_sysfs(os.path.join(device, "vendor")), _read_sysfs(os.path.join(device, "model")))))
+        # The block device has a size only while a disc is in the tray
+        size = _read_sysfs(os.path.join(sysfs_block, name, "size"))
+        drives.append({
+            "drive": f"/dev/{name}",
+            "media_loaded": bool(size and size != "0"),
+            "name": model or "CD-ROM Drive",
+        })
+    return drives
+
+
+def device_signature():
+    """Cheap fingerprint of the set of devices; None when it cannot be taken (the cache is then bypassed)."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            return ["win32", ctypes.windll.kernel32.GetLogicalDrives()]
+        except (ImportError, AttributeError, OSError):
+            return None
+    try:
+        names = sorted(os.listdir(SYSFS_BLOCK))
+    except OSError:
+        return None
+    try:
+        udev_mtime = os.stat(UDEV_DATA).st_mtime_ns
+    except OSError:
+        udev_mtime = None
+    return ["sysfs", names, udev_mtime]
+
+
+def scan_optical_drives():
+    """Enumerate the optical drives without the cache."""
+    if sys.platform == "win32":
+        from windows import get_optical_drives
+        return get_optical_drives()
+    if sys.platform.startswith("linux"):
+        return sysfs_optical_drives()
+    return []
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cache(cache_path, signature, drives):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"signature": signature, "drives": drives}, f)
+    os.replace(tmp_path, cache_path)
+
+
+def list_optical_drives(refresh=False, cache_path=DRIVE_CACHE_PATH):
+    """
+    Optical drives as returned by scan_optical_drives, from the cache while the device signature
+    is unchanged.
+    refresh: Rescan even if the cache is still valid
+    """
+    signature = device_signature()
+    if signature is not None and not refresh:
+        cached = _load_cache(cache_path)
+        if cached and cached.get("signature") == signature:
+            logger.debug(f"Using cached drive list from {cache_path}")
+            return cached["drives"]
+    drives = scan_optical_drives()
+    if signature is not None:
+        try:
+            _save_cache(cache_path, signature, drives)
+        except OSError as e:
+            logger.debug(f"Could not write the drive cache: {e}")
+    return drives
+
+
+if __name__ == "__main__":
+    for drive in list_optical_drives(refresh="--refresh" in sys.argv[1:]):
+        print(f"Drive: {drive['drive']}, Media Loaded: {drive['media_loaded']}, Name: {drive['name']}")
@@ -0,0 +1,188 @@
+"""
+Burn one ISO to several drives at once and verify every disc by reading it back.
+
+    python duplicate.py image.iso /dev/sr0 /dev/sr1 /dev/sr2 [--no-verify]
+"""
+import errno
+import hashlib
+import mmap
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from linux import growisofs_command
+from metrics import PipelineMetrics
+
+VERIFY_CHUNK_SIZE = 4 * 1024 * 1024
+# growisofs reloads the tray after burning; give the drive this long to show the new disc
+DEVICE_READY_TIMEOUT = 90.0
+DEVICE_RETRY_ERRNOS = (errno.ENOMEDIUM, errno.EIO, errno.EBUSY, errno.ENXIO)
+
+
+class ImageDigests:
+    """
+    Per-chunk SHA-256 digests of the ISO, computed once from a shared memory map and used to
+    verify every drive. Computing them while the burns run also pulls the ISO into the page
+    cache, so the growisofs processes read it from memory instead of each hitting the disk.
+    """
+
+    def __init__(self, iso_path, chunk_size=VERIFY_CHUNK_SIZE):
+        self.iso_path = iso_path
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(iso_path)
+        self.chunks = []
+        self.sha256 = None
+        self._done = threading.Event()
+
+    def compute(self):
+        try:
+            self._compute()
+        finally:
+            self._done.set()
+
+    def _compute(self):
+        full = hashlib.sha256()
+        with open(self.iso_path, "rb") as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image, memoryview(image) as view:
+                for offset in range(0, self.size, self.chunk_size):
+                    with view[offset:offset + self.chunk_size] as chunk:
+                        self.chunks.append(hashlib.sha256(chunk).digest())
+                        full.update(chunk)
+        self.sha256 = full.hexdigest()
+
+    def wait(self):
+        self._done.wait()
+
+
+def open_disc(drive, timeout=DEVICE_READY_TIMEOUT):
+    """Open drive for reading, waiting for the freshly burned disc to be recognised."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return open(drive, "rb", buffering=0)
+        except OSError as e:
+            if e.errno not in DEVICE_RETRY_ERRNOS or time.monotonic() > deadline:
+                raise
+            time.sleep(2.0)
+
+
+def verify_disc(drive, digests):
+    """
+    Read the disc in drive back in chunks and compare each chunk with the ISO.
+    Returns (ok, sha256 of the data read, byte offset of the first mismatch or None).
+    """
+    digests.wait()
+    if digests.sha256 is None:
+        raise OSError(f"could not read {digests.iso_path}")
+    full = hashlib.sha256()
+    buffer = bytearray(digests.chunk_size)
+    with open_disc(drive) as disc:
+        if hasattr(os, "posix_fadvise"):
+            # Drop anything the kernel cached for this device before the burn
+            os.posix_fadvise(disc.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        for index, expected in enumerate(digests.chunks):
+            offset = index * digests.chunk_size
+            want = min(digests.chunk_size, digests.size - offset)
+            got = 0
+            while got < want:
+                n = disc.readinto(memoryview(buffer)[got:want])
+                if not n:
+                    break
+                got += n
+            chunk = bytes(buffer[:got]) if got < len(buffer) else buffer
+            full.update(chunk)
+            if got != want or hashlib.sha256(chunk).digest() != expected:
+                return False, None, offset
+    return True, full.hexdigest(), None
+
+
+def burn_and_verify(iso_path, drive, digests, verify=True, metrics_path=None):
+    """Burn iso_path to drive, then read the disc back. Returns this drive's report entry."""
+    metrics = PipelineMetrics(metrics_path, job=drive)
+    entry = {"drive": drive, "burn": "failed", "verify": "skipped", "error": None, "sha256": None}
+    start = time.monotonic()
+    with metrics.stage("burn", output_path=iso_path) as info:
+        result = subprocess.run(growisofs_command(drive, iso_path=iso_path), capture_output=True, text=True)
+        if result.returncode != 0:
+            info["status"] = "failed"
+            lines = result.stderr.strip().splitlines()
+            entry["error"] = lines[-1] if lines else f"growisofs exited with code {result.returncode}"
+    entry["burn_s"] = time.monotonic() - start
+    if entry["error"]:
+        logger.error(f"{drive}: burn failed: {entry['error']}")
+        return entry
+    entry["burn"] = "ok"
+    logger.info(f"{drive}: burned in {entry['burn_s']:.0f}s")
+    if not verify:
+        return entry
+
+    start = time.monotonic()
+    entry["verify"] = "failed"
+    with metrics.stage("verify") as info:
+        try:
+            ok, sha256, bad_offset = verify_disc(drive, digests)
+        except OSError as e:
+            ok, sha256, bad_offset = False, None, None
+            entry["error"] = f"read-back failed: {e}"
+        if ok:
+            entry["verify"] = "ok"
+            entry["sha256"] = sha256
+        else:
+            info["status"] = "failed"
+            if bad_offset is not None:
+                entry["error"] = f"mismatch at byte {bad_offset}"
+    entry["verify_s"] = time.monotonic() - start
+    logger.info(f"{drive}: verify {entry['verify']} in {entry['verify_s']:.0f}s" + (f" ({entry['error']})" if entry["error"] else ""))
+    return entry
+
+
+def duplicate_iso(iso_path, drives, verify=True, metrics_path=None):
+    """
+    Burn iso_path to every drive in parallel, then verify each disc against the ISO.
+    iso_path: ISO image to burn
+    drives: DVD devices (e.g. ['/dev/sr0', '/dev/sr1'])
+    verify: Read every disc back and compare it with the ISO
+    metrics_path: Optional JSON-lines file for per-drive burn/verify stage records
+
+    Returns one report entry per drive, in the order given.
+    """
+    drives = list(dict.fromkeys(drives))
+    digests = ImageDigests(iso_path)
+    logger.info(f"Duplicating {iso_path} ({digests.size / 1e6:.1f} MB) to {len(drives)} drive(s)...")
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(drives) + 1) as executor:
+        digest_future = executor.submit(digests.compute)
+        futures = [executor.submit(burn_and_verify, iso_path, drive, digests, verify, metrics_path) for drive in drives]
+        report = [future.result() for future in futures]
+        digest_future.result()
+    print_duplication_report(report, digests, time.monotonic() - start)
+    return report
+
+
+def print_duplication_report(report, digests, elapsed):
+    """Log a per-drive pass/fail table."""
+    logger.info(f"Duplication report for {digests.iso_path} (sha256 {digests.sha256}):")
+    for entry in report:
+        passed = entry["burn"] == "ok" and entry["verify"] in ("ok", "skipped")
+        line = f"  {entry['drive']:12s} {'PASS' if passed else 'FAIL'}  burn={entry['burn']:6s} verify={entry['verify']:7s}"
+        if entry["error"]:
+            line += f"  ({entry['error']})"
+        logger.info(line)
+    passed = sum(1 for e in report if e["burn"] == "ok" and e["verify"] in ("ok", "skipped"))
+    logger.info(f"{passed}/{len(report)} discs passed in {elapsed:.0f}s")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--no-verify"]
+    if len(args) < 2:
+        print("Usage: python duplicate.py <image.iso> <drive> [<drive> ...] [--no-verify]", file=sys.stderr)
+        sys.exit(2)
+    results = duplicate_iso(args[0], args[1:], verify="--no-verify" not in sys.argv)
+    sys.exit(0 if all(e["burn"] == "ok" and e["verify"] != "failed" for e in results) else 1)
@@ -0,0 +1,387 @@
+import json
+import os
+import platform
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from metrics import run_ffmpeg_with_progress
+from probe import get_duration, get_keyframes, get_streams
+
+# ffmpeg output options for the NTSC DVD MPEG-2 transcode
+FFMPEG_DVD_ARGS = ["-target", "ntsc-dvd", "-b:v", "1800k"]
+
+# Per-host encoder settings picked by autotune.py
+ENCODER_PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "simplified-dvd", "encoder_profiles.json")
+
+# DVD program stream muxer settings (what -target ntsc-dvd uses)
+DVD_MUX_ARGS = ["-f", "dvd", "-muxrate", "10080000", "-packetsize", "2048"]
+
+# What an NTSC DVD accepts without re-encoding
+DVD_VIDEO_CODECS = ("mpeg2video",)
+DVD_NTSC_SIZES = ((720, 480), (704, 480), (352, 480), (352, 240))
+DVD_NTSC_FRAME_RATES = ("30000/1001",)
+DVD_MAX_VIDEO_BITRATE = 9800000
+DVD_AUDIO_CODECS = ("ac3", "mp2")
+DVD_AUDIO_SAMPLE_RATE = "48000"
+DVD_MAX_AUDIO_TRACKS = 8
+
+# What -target ntsc-dvd does to the audio
+DVD_AUDIO_ARGS = ["-c:a", "ac3", "-b:a", "448k", "-ar", DVD_AUDIO_SAMPLE_RATE]
+AUDIO_BITRATE = 448_000
+# Program stream pack headers and navigation packs on top of the elementary streams
+MUX_OVERHEAD = 1.03
+
+# Encode paths, cheapest first
+ENCODE_COPY = "copy"
+ENCODE_AUDIO = "audio"
+ENCODE_FULL = "full"
+
+# Segments shorter than this are not worth the extra ffmpeg start-up and seek
+MIN_SEGMENT_SECONDS = 30.0
+
+# Automatic chapters: one about every this many seconds, moved to a scene cut within the snap window
+DEFAULT_CHAPTER_INTERVAL = 300.0
+CHAPTER_SNAP_SECONDS = 30.0
+
+
+def host_key():
+    """Identifies the encoding hardware: host name, CPU model and core count."""
+    cpu_model = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu_model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return f"{platform.node()}|{cpu_model}|{os.cpu_count()}"
+
+
+def load_encoder_profile(profile_path=ENCODER_PROFILE_PATH):
+    """The autotuned profile saved for this host, or None."""
+    try:
+        with open(profile_path, "r", encoding="utf-8") as f:
+            return json.load(f).get(host_key())
+    except (OSError, ValueError):
+        return None
+
+
+def dvd_encode_args(video_bitrate=None, tuned=True):
+    """
+    FFMPEG_DVD_ARGS, with the average video bitrate (bits/s) replaced when given and,
+    if tuned, the encoder settings autotuned for this host appended.
+    """
+    args = list(FFMPEG_DVD_ARGS)
+    if video_bitrate:
+        args[args.index("-b:v") + 1] = f"{int(video_bitrate) // 1000}k"
+    profile = load_encoder_profile() if tuned else None
+    if profile:
+        args += profile["args"]
+    return args
+
+
+def encode_bitrate(args=None):
+    """Average video bitrate in bits/s set by the -b:v option of args (default: dvd_encode_args())."""
+    args = dvd_encode_args() if args is None else args
+    value = args[args.index("-b:v") + 1].lower()
+    scale = {"k": 1000, "m": 1000_000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+def estimate_mpeg_bytes(duration, video_bitrate=None, audio_tracks=1):
+    """Expected size of a DVD program stream of duration seconds (video_bitrate defaults to encode_bitrate())."""
+    video_bitrate = video_bitrate or encode_bitrate()
+    return duration * (video_bitrate + AUDIO_BITRATE * audio_tracks) / 8 * MUX_OVERHEAD
+
+
+def ffmpeg_dvd_command(file_path, output_mpg, video_bitrate=None):
+    """Single-process ffmpeg command that transcodes file_path to a DVD program stream."""
+    return ["ffmpeg", "-nostdin", "-v", "error", "-i", file_path] + dvd_encode_args(video_bitrate) + [output_mpg]
+
+
+def ffmpeg_dvd_stream_command(file_path, video_bitrate=None, start=None, end=None):
+    """
+    ffmpeg command that writes the DVD program stream for file_path to stdout.
+    start, end: Optional time range in seconds; ffmpeg seeks to start and reads only up to end,
+        so a part of a long input is encoded without a trimmed copy (start should be a keyframe)
+    """
+    cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+    if start:
+        cmd += ["-ss", f"{start:.6f}"]
+    cmd += ["-i", file_path]
+    if end is not None:
+        cmd += ["-t", f"{end - (start or 0.0):.6f}"]
+    return cmd + dvd_encode_args(video_bitrate) + ["-"]
+
+
+def is_dvd_video_stream(stream):
+    """True if a video stream can be stream-copied into an NTSC DVD program stream."""
+    bit_rate = stream.get("bit_rate")
+    return (
+        stream.get("codec_name") in DVD_VIDEO_CODECS
+        and (stream.get("width"), stream.get("height")) in DVD_NTSC_SIZES
+        and stream.get("r_frame_rate") in DVD_NTSC_FRAME_RATES
+        and stream.get("pix_fmt") == "yuv420p"
+        and (not bit_rate or not bit_rate.isdigit() or int(bit_rate) <= DVD_MAX_VIDEO_BITRATE)
+    )
+
+
+def is_dvd_audio_stream(stream):
+    """True if an audio stream can be stream-copied into a DVD program stream."""
+    return stream.get("codec_name") in DVD_AUDIO_CODECS and stream.get("sample_rate") == DVD_AUDIO_SAMPLE_RATE
+
+
+def choose_encode_mode(streams):
+    """
+    Pick the cheapest valid path for the probed streams:
+    ENCODE_COPY if video and audio are DVD compliant, ENCODE_AUDIO if only the video is,
+    ENCODE_FULL otherwise.
+    """
+    video = [s for s in streams if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")]
+    audio = [s for s in streams if s.get("codec_type") == "audio"]
+    if not video or not is_dvd_video_stream(video[0]):
+        return ENCODE_FULL
+    if all(is_dvd_audio_stream(a) for a in audio):
+        return ENCODE_COPY
+    return ENCODE_AUDIO
+
+
+def ffmpeg_remux_command(file_path, output_mpg, mode):
+    """
+    ffmpeg command for the cheap paths: stream-copy everything (ENCODE_COPY), or copy the
+    video and transcode only the audio to AC-3 (ENCODE_AUDIO). output_mpg may be '-' for stdout.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-v", "error", "-i", file_path, "-map", "0:v:0", "-map", "0:a?", "-c:v", "copy"]
+    if mode == ENCODE_COPY:
+        cmd += ["-c:a", "copy"]
+    else:
+        cmd += DVD_AUDIO_ARGS
+    return cmd + DVD_MUX_ARGS + [output_mpg]
+
+
+def parse_audio_track(spec):
+    """
+    Split an extra audio track spec 'path[:lang]' into (path, lang).
+    lang is a two-letter ISO 639-1 code (e.g. 'en'), or None.
+    """
+    path, sep, lang = spec.rpartition(":")
+    if sep and len(lang) == 2 and lang.isalpha():
+        return path, lang.lower()
+    return spec, None
+
+
+def has_audio_stream(file_path):
+    """Whether file_path has an audio stream (assumed when ffprobe cannot tell, ffmpeg may still read it)."""
+    try:
+        return any(s.get("codec_type") == "audio" for s in get_streams(file_path))
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return True
+
+
+def find_split_points(keyframes, duration, segments):
+    """
+    Split [0, duration] into at most `segments` ranges whose boundaries fall on keyframes.
+    Returns a list of (start, end) tuples; end is None for the last range (read to EOF).
+    """
+    boundaries = [0.0]
+    for i in range(1, segments):
+        target = duration * i / segments
+        candidates = [k for k in keyframes if k > boundaries[-1]]
+        if not candidates:
+            break
+        nearest = min(candidates, key=lambda k: abs(k - target))
+        if nearest < duration:
+            boundaries.append(nearest)
+    ranges = []
+    for i, start in enumerate(boundaries):
+        end = boundaries[i + 1] if i + 1 < len(boundaries) else None
+        ranges.append((start, end))
+    return ranges
+
+
+def plan_chapters(keyframes, duration, interval=DEFAULT_CHAPTER_INTERVAL, snap=CHAPTER_SNAP_SECONDS):
+    """
+    Chapter start times (seconds) about every interval seconds, always starting at 0.
+    Each mark is placed on a source keyframe near its target. Keyframes that break the regular
+    GOP cadence were inserted by the source encoder at scene cuts, so those are preferred.
+    """
+    if not interval or duration <= interval or not keyframes:
+        return [0.0]
+    gaps = sorted(b - a for a, b in zip(keyframes, keyframes[1:]))
+    regular_gap = gaps[len(gaps) // 2] if gaps else 0.0
+    scene_cuts = {b for a, b in zip(keyframes, keyframes[1:]) if b - a < regular_gap * 0.9}
+    chapters = [0.0]
+    target = interval
+    while target < duration - interval / 2:
+        nearby = [k for k in keyframes if abs(k - target) <= snap and k > chapters[-1]]
+        if nearby:
+            cuts = [k for k in nearby if k in scene_cuts]
+            mark = min(cuts or nearby, key=lambda k: abs(k - target))
+            chapters.append(round(mark, 3))
+            target = mark + interval
+        else:
+            target += interval
+    return chapters
+
+
+def encode_video_segment(file_path, start, end, output_m2v, threads=1):
+    """
+    Encode [start, end) of file_path to a closed-GOP MPEG-2 elementary stream.
+    start must be a keyframe so the chunk boundary is frame exact.
+    """
+    cmd = ["ffmpeg", "-y", "-v", "error", "-ss", f"{start:.6f}", "-i", file_path]
+    if end is not None:
+        cmd += ["-t", f"{end - start:.6f}"]
+    cmd += ["-an", "-sn"] + dvd_encode_args() + ["-threads", str(threads), "-flags", "+cgop", "-f", "mpeg2video", output_m2v]
+    return subprocess.run(cmd).returncode
+
+
+def encode_audio(file_path, output_ac3):
+    """Encode the first audio stream of file_path to DVD AC-3."""
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", file_path, "-vn", "-sn"] + FFMPEG_DVD_ARGS + ["-f", "ac3", output_ac3]
+    return subprocess.run(cmd).returncode
+
+
+def video_stream_command(file_path, output_m2v, copy=False):
+    """ffmpeg command for the MPEG-2 video elementary stream alone: encoded, or stream-copied if already compliant."""
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", file_path, "-map", "0:v:0", "-an", "-sn"]
+    cmd += ["-c:v", "copy"] if copy else dvd_encode_args()
+    return cmd + ["-f", "mpeg2video", output_m2v]
+
+
+def audio_stream_command(file_path, output_mka, copy=False):
+    """
+    ffmpeg command for the first audio stream of file_path alone: DVD AC-3, or stream-copied
+    if already compliant. Matroska holds either codec until the mux step.
+    """
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", file_path, "-map", "0:a:0", "-vn", "-sn"]
+    cmd += ["-c:a", "copy"] if copy else DVD_AUDIO_ARGS
+    return cmd + ["-f", "matroska", output_mka]
+
+
+def encode_split(file_path, output_mpg, workdir, extra_audio=(), mode=ENCODE_FULL, metrics=None, duration=None):
+    """
+    Encode the video and audio elementary streams in separate concurrent ffmpeg processes,
+    then mux them into a DVD program stream without re-encoding.
+    file_path: Path to input video file
+    output_mpg: Path of the DVD program stream to create
+    workdir: Directory for the intermediate streams
+    extra_audio: Additional audio files (commentary, other languages) to add as extra tracks
+    mode: ENCODE_FULL, or ENCODE_COPY/ENCODE_AUDIO to stream-copy the compliant parts
+    metrics: Optional PipelineMetrics receiving the video encoder's progress
+    duration: Input duration in seconds, for progress percentages
+
+    Returns True on success.
+    """
+    audio_sources = ([file_path] if has_audio_stream(file_path) else []) + list(extra_audio)
+    if len(audio_sources) > DVD_MAX_AUDIO_TRACKS:
+        logger.error(f"A DVD title holds at most {DVD_MAX_AUDIO_TRACKS} audio tracks, got {len(audio_sources)}!")
+        return False
+
+    stream_dir = os.path.join(workdir, "streams")
+    os.makedirs(stream_dir, exist_ok=True)
+    video_path = os.path.join(stream_dir, "video.m2v")
+    audio_paths = [os.path.join(stream_dir, f"audio_{i:02d}.mka") for i in range(len(audio_sources))]
+    video_cmd = video_stream_command(file_path, video_path, copy=mode != ENCODE_FULL)
+    audio_cmds = [
+        audio_stream_command(source, path, copy=mode == ENCODE_COPY and source == file_path)
+        for source, path in zip(audio_sources, audio_paths)
+    ]
+    logger.info(f"Encoding video and {len(audio_cmds)} audio track(s) in parallel...")
+
+    with ThreadPoolExecutor(max_workers=len(audio_cmds) + 1) as executor:
+        audio_futures = [executor.submit(subprocess.run, cmd) for cmd in audio_cmds]
+        if metrics:
+            video_code = run_ffmpeg_with_progress(video_cmd, metrics, duration=duration)
+        else:
+            video_code = subprocess.run(video_cmd).returncode
+        audio_codes = [f.result().returncode for f in audio_futures]
+
+    if video_code != 0:
+        logger.error("ffmpeg failed to encode the video stream!")
+        return False
+    if any(code != 0 for code in audio_codes):
+        logger.error("ffmpeg failed to encode one or more audio tracks!")
+        return False
+
+    logger.info("Muxing the elementary streams into a DVD program stream...")
+    if mux_program_stream([video_path], audio_paths, output_mpg) != 0:
+        logger.error("ffmpeg failed to mux the streams!")
+        return False
+    for path in [video_path] + audio_paths:
+        os.remove(path)
+    return True
+
+
+def mux_program_stream(video_inputs, audio_inputs, output_mpg):
+    """
+    Losslessly join MPEG-2 elementary video chunks and mux them with audio streams
+    into a DVD program stream.
+    """
+    cmd = ["ffmpeg", "-y", "-v", "error", "-fflags", "+genpts", "-i", "concat:" + "|".join(video_inputs)]
+    for audio in audio_inputs:
+        cmd += ["-i", audio]
+    cmd += ["-map", "0:v:0"]
+    for i in range(len(audio_inputs)):
+        cmd += ["-map", f"{i + 1}:a:0"]
+    cmd += ["-c", "copy"] + DVD_MUX_ARGS + [output_mpg]
+    return subprocess.run(cmd).returncode
+
+
+def encode_segmented(file_path, output_mpg, workdir, segments=None, extra_audio=()):
+    """
+    Transcode file_path to output_mpg by encoding keyframe-aligned chunks in parallel.
+    file_path: Path to input video file
+    output_mpg: Path of the DVD program stream to create
+    workdir: Directory for the intermediate chunks
+    segments: Number of chunks (defaults to the number of CPU cores)
+    extra_audio: Additional audio files to add as extra tracks
+
+    Returns True on success.
+    """
+    cpus = os.cpu_count() or 1
+    duration = get_duration(file_path)
+    segments = segments or cpus
+    segments = max(1, min(segments, int(duration // MIN_SEGMENT_SECONDS)))
+    ranges = find_split_points(get_keyframes(file_path), duration, segments)
+    threads = max(1, cpus // len(ranges))
+    logger.info(f"Encoding {len(ranges)} segments in parallel ({threads} threads each)...")
+
+    segment_dir = os.path.join(workdir, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+    chunk_paths = [os.path.join(segment_dir, f"chunk_{i:04d}.m2v") for i in range(len(ranges))]
+    # A silent input only gets the extra tracks, if any
+    audio_paths = [os.path.join(segment_dir, "audio.ac3")] if has_audio_stream(file_path) else []
+    extra_paths = [os.path.join(segment_dir, f"audio_{i + 1:02d}.mka") for i in range(len(extra_audio))]
+
+    # Audio is cheap, encode it once over the whole input alongside the video chunks
+    with ThreadPoolExecutor(max_workers=len(ranges) + 1 + len(extra_audio)) as executor:
+        audio_futures = [executor.submit(encode_audio, file_path, path) for path in audio_paths]
+        extra_futures = [
+            executor.submit(subprocess.run, audio_stream_command(source, path))
+            for source, path in zip(extra_audio, extra_paths)
+        ]
+        video_futures = [
+            executor.submit(encode_video_segment, file_path, start, end, chunk, threads)
+            for (start, end), chunk in zip(ranges, chunk_paths)
+        ]
+        video_codes = [f.result() for f in video_futures]
+        audio_codes = [f.result() for f in audio_futures] + [f.result().returncode for f in extra_futures]
+
+    if any(code != 0 for code in video_codes):
+        logger.error("ffmpeg failed to encode one or more video segments!")
+        return False
+    if any(code != 0 for code in audio_codes):
+        logger.error("ffmpeg failed to encode the audio track!")
+        return False
+
+    logger.info("Joining segments into a DVD program stream...")
+    if mux_program_stream(chunk_paths, audio_paths + extra_paths, output_mpg) != 0:
+        logger.error("ffmpeg failed to mux the segments!")
+        return False
+    for path in chunk_paths + audio_paths + extra_paths:
+        os.remove(path)
+    return True
@@ -0,0 +1,100 @@
+"""
+Background worker for the GUI.
+
+The queued videos are built in a separate process, so Tk's event loop never blocks. Every metrics
+record of the pipeline (stage start/end, ffmpeg progress with percent and ETA) is forwarded over a
+multiprocessing queue, which the GUI drains from root.after(). The worker leads its own process
+group (a job object tree on Windows), so cancelling takes ffmpeg, dvdauthor and the burner down with it.
+"""
+import multiprocessing
+import os
+import platform
+import signal
+import subprocess
+import traceback
+
+# Events sent to the GUI besides the metrics records
+JOB_START = "job_start"
+JOB_DONE = "job_done"
+INSERT_DISC = "insert_disc"
+QUEUE_DONE = "queue_done"
+
+
+def iso_path_for(file_path, output_dir):
+    """ISO written for file_path: <output_dir>/<video name>.iso (next to the video when output_dir is None)."""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.abspath(os.path.join(output_dir or os.path.dirname(os.path.abspath(file_path)), f"{stem}.iso"))
+
+
+def run_queue_worker(file_paths, options, events, disc_ready):
+    """
+    Build every video in file_paths in order. Runs in the worker process.
+    options: {'burn', 'iso', 'burn_drive', 'output_dir'} as chosen in the GUI
+    events: Queue receiving the metrics records and the job/queue events
+    disc_ready: Event the GUI sets once a blank disc is in the drive for the next job
+    """
+    if hasattr(os, "setsid"):
+        os.setsid()
+    # Imported here so the spawned process starts fast and the GUI process never loads the pipeline
+    from linux import run_for_linux
+    from scratch import scratch_path
+    from windows import run_for_windows
+
+    results = []
+    burn_drive = options["burn_drive"] if options["burn"] else None
+    for number, file_path in enumerate(file_paths, start=1):
+        if burn_drive and number > 1:
+            disc_ready.clear()
+            events.put({"event": INSERT_DISC, "number": number, "total": len(file_paths)})
+            disc_ready.wait()
+        events.put({"event": JOB_START, "number": number, "total": len(file_paths), "file_path": file_path})
+        iso_output = iso_path_for(file_path, options["output_dir"]) if options["iso"] or platform.system() == "Windows" else None
+        try:
+            if platform.system() == "Windows":
+                result = run_for_windows(
+                    burn=options["burn"], iso="dvd.xml", burn_drive=burn_drive, iso_output=iso_output,
+                    file_path=file_path, workdir=scratch_path("dvd_workdir"), on_event=events.put
+                )
+            else:
+                result = run_for_linux(
+                    burn=options["burn"], iso="dvd.xml", burn_drive=burn_drive, iso_output=iso_output,
+                    file_path=file_path, workdir=scratch_path("dvd_workdir"), make_iso=options["iso"], on_event=events.put
+                )
+            error = None if result else "a pipeline step failed, see the log"
+        except Exception as e:
+            traceback.print_exc()
+            result, error = None, str(e)
+        results.append({"file_path": file_path, "result": result, "error": error})
+        events.put({"event": JOB_DONE, "number": number, "total": len(file_paths), "file_path": file_path, "result": result, "error": error})
+    events.put({"event": QUEUE_DONE, "results": results})
+
+
+def start_worker(file_paths, options):
+    """
+    Start run_queue_worker in a new process.
+    Returns (process, event queue, disc_ready event).
+    """
+    # spawn everywhere: forking a process that runs Tk is unsafe on Linux and unavailable on Windows
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    disc_ready = context.Event()
+    process = context.Process(target=run_queue_worker, args=(list(file_paths), dict(options), events, disc_ready), daemon=True)
+    process.start()
+    return process, events, disc_ready
+
+
+def cancel_worker(process, timeout=5.0):
+    """Terminate the worker and every subprocess it started."""
+    if not process.is_alive():
+        return
+    if platform.system() == "Windows":
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    process.join(timeout)
+    if process.is_alive():
+        process.kill()
+        process.join()
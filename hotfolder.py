@@ -0,0 +1,388 @@
+"""
+Hot-folder daemon: watches directories for new videos and builds one ISO per file.
+
+New files are picked up with inotify (a slow directory scan is used where inotify is not
+available), queued in a SQLite database that survives restarts, and built by a bounded
+process pool through the same run_job used by batch mode:
+
+    python hotfolder.py watch incoming/ --output-dir dvd_out --jobs 2
+    python hotfolder.py status --output-dir dvd_out
+    python hotfolder.py retry --output-dir dvd_out
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import sqlite3
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import typer
+from loguru import logger
+
+from batch import run_job
+from scratch import scratch_path
+
+app = typer.Typer()
+
+VIDEO_EXTENSIONS = (".mp4", ".m4v", ".mkv", ".mov", ".avi", ".mpg", ".mpeg", ".ts", ".webm", ".wmv")
+QUEUE_DB_NAME = "queue.sqlite3"
+HOTFOLDER_WORKROOT = "dvd_hotfolder"
+POLL_INTERVAL = 5.0
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+def is_video_file(path):
+    name = os.path.basename(path)
+    return not name.startswith(".") and name.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def scan_dirs(watch_dirs):
+    """Every video file currently in the watched directories."""
+    paths = []
+    for watch_dir in watch_dirs:
+        for name in sorted(os.listdir(watch_dir)):
+            path = os.path.join(watch_dir, name)
+            if is_video_file(path) and os.path.isfile(path):
+                paths.append(path)
+    return paths
+
+
+class InotifyWatcher:
+    """
+    Reports files that were closed after writing or moved into the watched directories.
+    Uses the Linux inotify API through ctypes, so no extra dependency is needed.
+    """
+
+    def __init__(self, watch_dirs):
+        self.watch_dirs = watch_dirs
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs_by_wd = {}
+        for watch_dir in watch_dirs:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(watch_dir), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {watch_dir}")
+            self.dirs_by_wd[wd] = watch_dir
+
+    def read(self, timeout):
+        """Wait up to timeout seconds and return the paths of the files that changed."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, fall back to a full scan so nothing is missed
+                logger.warning("inotify queue overflowed, rescanning the watched directories")
+                paths.extend(scan_dirs(self.watch_dirs))
+            elif wd in self.dirs_by_wd and name:
+                paths.append(os.path.join(self.dirs_by_wd[wd], os.fsdecode(name)))
+        return [p for p in paths if is_video_file(p)]
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for systems without inotify: rescans the watched directories every POLL_INTERVAL seconds."""
+
+    def __init__(self, watch_dirs):
+        self.watch_dirs = watch_dirs
+
+    def read(self, timeout):
+        time.sleep(max(timeout, POLL_INTERVAL))
+        return scan_dirs(self.watch_dirs)
+
+    def close(self):
+        pass
+
+
+def make_watcher(watch_dirs):
+    try:
+        return InotifyWatcher(watch_dirs)
+    except (OSError, AttributeError, TypeError) as e:
+        logger.warning(f"inotify is not available ({e}), polling every {POLL_INTERVAL:.0f}s instead")
+        return PollingWatcher(watch_dirs)
+
+
+class JobQueue:
+    """
+    Persistent job queue in a SQLite database.
+    A file is identified by its path, size and mtime, so re-copying a changed file queues it again
+    while restarting the daemon never queues the same file twice.
+    """
+
+    def __init__(self, db_path):
+        self.db = sqlite3.connect(db_path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                iso_output TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL,
+                UNIQUE (file_path, size, mtime_ns)
+            )"""
+        )
+        self.db.commit()
+
+    def enqueue(self, file_path, size, mtime_ns):
+        """Queue a file. Returns the new job id, or None if this exact file was queued before."""
+        now = time.time()
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO jobs (file_path, size, mtime_ns, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (file_path, size, mtime_ns, STATUS_QUEUED, now, now),
+        )
+        self.db.commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def requeue_interrupted(self):
+        """Put jobs that were running when the daemon stopped back in the queue."""
+        cursor = self.db.execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE status = ?", (STATUS_QUEUED, time.time(), STATUS_RUNNING)
+        )
+        self.db.commit()
+        return cursor.rowcount
+
+    def retry(self, job_ids=None):
+        """Queue failed jobs again (all of them, or only job_ids)."""
+        query = "UPDATE jobs SET status = ?, error = NULL, updated = ? WHERE status = ?"
+        params = [STATUS_QUEUED, time.time(), STATUS_FAILED]
+        if job_ids:
+            query += f" AND id IN ({', '.join('?' * len(job_ids))})"
+            params += list(job_ids)
+        cursor = self.db.execute(query, params)
+        self.db.commit()
+        return cursor.rowcount
+
+    def claim(self):
+        """Mark the oldest queued job as running and return it (None if the queue is empty)."""
+        row = self.db.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (STATUS_QUEUED,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.db.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+            (STATUS_RUNNING, time.time(), row["id"]),
+        )
+        self.db.commit()
+        return dict(row, attempts=row["attempts"] + 1)
+
+    def finish(self, job_id, status, iso_output=None, error=None):
+        self.db.execute(
+            "UPDATE jobs SET status = ?, iso_output = ?, error = ?, updated = ? WHERE id = ?",
+            (status, iso_output, error, time.time(), job_id),
+        )
+        self.db.commit()
+
+    def jobs(self):
+        return [dict(row) for row in self.db.execute("SELECT * FROM jobs ORDER BY id")]
+
+
+def plan_hotfolder_job(row, output_dir, workroot=HOTFOLDER_WORKROOT, use_cache=True):
+    """
+    Job description for run_job. Results go to output_dir/<id>_<name>/ (ISO, metrics and build.log).
+    A job that is attempted again resumes from the workdir its previous attempt left behind.
+    """
+    stem = os.path.splitext(os.path.basename(row["file_path"]))[0]
+    job_dir = os.path.abspath(os.path.join(output_dir, f"{row['id']:05d}_{stem}"))
+    return {
+        "index": row["id"],
+        "file_path": row["file_path"],
+        "iso_output": os.path.join(job_dir, f"{stem}.iso"),
+        "workdir": os.path.abspath(os.path.join(workroot, f"job_{row['id']:05d}_{stem}")),
+        "use_cache": use_cache,
+        "resume": row["attempts"] > 1,
+        "metrics_path": os.path.join(job_dir, f"{stem}.metrics.jsonl"),
+        "log_path": os.path.join(job_dir, "build.log"),
+    }
+
+
+def run_logged_job(job):
+    """
+    Run one job in a pool worker with its stdout and stderr (our log lines and the output of
+    ffmpeg, dvdauthor and genisoimage) redirected to the job's build.log.
+    """
+    os.makedirs(os.path.dirname(job["log_path"]), exist_ok=True)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(job["log_path"], "a", encoding="utf-8") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            return run_job(job)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            for fd in saved:
+                os.close(fd)
+
+
+def update_pending(pending, paths, settle, queue):
+    """
+    Track candidate files until they have stopped changing for settle seconds, then queue them.
+    pending maps path -> ((size, mtime_ns), monotonic time the signature was first seen).
+    """
+    now = time.monotonic()
+    for path in paths:
+        pending.setdefault(os.path.abspath(path), (None, now))
+    for path, (signature, since) in list(pending.items()):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            del pending[path]
+            continue
+        current = (st.st_size, st.st_mtime_ns)
+        if current != signature:
+            pending[path] = (current, now)
+        elif now - since >= settle:
+            del pending[path]
+            if st.st_size == 0:
+                continue
+            job_id = queue.enqueue(path, st.st_size, st.st_mtime_ns)
+            if job_id:
+                logger.info(f"Queued job {job_id}: {path}")
+
+
+def serve(watch_dirs, output_dir, max_jobs=1, settle=5.0, use_cache=True, workroot=HOTFOLDER_WORKROOT):
+    """
+    Watch watch_dirs and build every new video until interrupted.
+    watch_dirs: Directories to watch (not recursive)
+    output_dir: Output tree; also holds the queue database
+    max_jobs: Number of concurrent builds
+    settle: Seconds a file's size and mtime must stay unchanged before it is queued
+    use_cache: Reuse cached transcodes on Linux (see cache.py)
+    workroot: Parent directory of the per-job scratch directories
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    queue = JobQueue(os.path.join(output_dir, QUEUE_DB_NAME))
+    interrupted = queue.requeue_interrupted()
+    if interrupted:
+        logger.info(f"Re-queued {interrupted} job(s) interrupted by the last shutdown")
+
+    watcher = make_watcher(watch_dirs)
+    pending = {}
+    # Files that arrived while the daemon was down
+    update_pending(pending, scan_dirs(watch_dirs), settle, queue)
+    logger.info(f"Watching {', '.join(watch_dirs)} with {max_jobs} concurrent job(s), output in {output_dir}")
+
+    running = {}
+    with ProcessPoolExecutor(max_workers=max_jobs) as executor:
+        try:
+            while True:
+                timeout = 1.0 if pending or running else POLL_INTERVAL
+                update_pending(pending, watcher.read(timeout), settle, queue)
+
+                while len(running) < max_jobs:
+                    row = queue.claim()
+                    if row is None:
+                        break
+                    job = plan_hotfolder_job(row, output_dir, workroot=workroot, use_cache=use_cache)
+                    logger.info(f"Starting job {row['id']} (attempt {row['attempts']}): {row['file_path']}")
+                    running[executor.submit(run_logged_job, job)] = job
+
+                for future in [f for f in running if f.done()]:
+                    job = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"status": STATUS_FAILED, "error": str(e), "seconds": 0.0}
+                    iso_output = job["iso_output"] if result["status"] == STATUS_OK else None
+                    queue.finish(job["index"], result["status"], iso_output=iso_output, error=result["error"])
+                    logger.info(
+                        f"Job {job['index']} {result['status']} in {result['seconds']:.1f}s: "
+                        f"{iso_output or result['error'] or job['log_path']}"
+                    )
+        except KeyboardInterrupt:
+            # Running jobs stay marked as running and are resumed on the next start
+            logger.info("Stopping, unfinished jobs will resume on the next start.")
+        finally:
+            watcher.close()
+
+
+@app.command()
+def watch(
+    watch_dirs: List[str] = typer.Argument(..., help="Directories to watch for new videos"),
+    output_dir: str = typer.Option("dvd_out", "--output-dir", help="Output tree for ISOs, metrics, logs and the job queue"),
+    jobs: int = typer.Option(1, "--jobs", help="Number of concurrent builds"),
+    settle: float = typer.Option(5.0, "--settle", help="Seconds a file must stay unchanged before it is queued"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't use the transcode cache (Linux)"),
+    scratch_dir: Optional[str] = typer.Option(None, "--scratch-dir", help="Where the job workdirs live, e.g. a tmpfs or NVMe volume (default: $SIMPLIFIED_DVD_SCRATCH or the current directory)"),
+):
+    """Watch directories and build an ISO for every video that lands in them."""
+    for watch_dir in watch_dirs:
+        if not os.path.isdir(watch_dir):
+            logger.error(f"{watch_dir} is not a directory")
+            raise typer.Exit(code=1)
+    serve(
+        [os.path.abspath(d) for d in watch_dirs], output_dir, max_jobs=jobs, settle=settle, use_cache=not no_cache,
+        workroot=scratch_path(HOTFOLDER_WORKROOT, scratch_dir)
+    )
+
+
+@app.command()
+def status(
+    output_dir: str = typer.Option("dvd_out", "--output-dir", help="Output tree of the daemon"),
+):
+    """List the jobs in the queue."""
+    db_path = os.path.join(output_dir, QUEUE_DB_NAME)
+    if not os.path.exists(db_path):
+        logger.info(f"No queue in {output_dir}")
+        return
+    for job in JobQueue(db_path).jobs():
+        line = f"  #{job['id']:05d} {job['status']:8s} attempts={job['attempts']}  {job['file_path']}"
+        if job["error"]:
+            line += f"  ({job['error']})"
+        logger.info(line)
+
+
+@app.command()
+def retry(
+    job_ids: Optional[List[int]] = typer.Argument(None, help="Job ids to retry (default: every failed job)"),
+    output_dir: str = typer.Option("dvd_out", "--output-dir", help="Output tree of the daemon"),
+):
+    """Queue failed jobs again; a running daemon picks them up and resumes from their workdirs."""
+    count = JobQueue(os.path.join(output_dir, QUEUE_DB_NAME)).retry(job_ids)
+    logger.info(f"Re-queued {count} failed job(s)")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,599 @@
+"""
+Native DVD-Video ISO9660 + UDF 1.02 bridge image writer.
+
+Writes the authored DVD folder (VIDEO_TS and AUDIO_TS) as a single image without genisoimage.
+All metadata is built in memory up front, so the image is written strictly sequentially
+and can go to a regular file or to a pipe such as stdout. File payloads are copied with
+os.sendfile where the platform supports it, so VOB data never passes through Python buffers.
+"""
+import os
+import shutil
+import struct
+import sys
+import time
+
+from loguru import logger
+
+SECTOR_SIZE = 2048
+
+# Fixed locations of the volume descriptors (sectors)
+ISO_PVD_SECTOR = 16
+UDF_MAIN_VDS_SECTOR = 32
+UDF_RESERVE_VDS_SECTOR = 48
+UDF_LVID_SECTOR = 64
+UDF_ANCHOR_SECTOR = 256
+UDF_PARTITION_START = 257
+
+# UDF descriptor tag identifiers (ECMA-167)
+TAG_PVD = 1
+TAG_AVDP = 2
+TAG_IUVD = 4
+TAG_PD = 5
+TAG_LVD = 6
+TAG_USD = 7
+TAG_TD = 8
+TAG_LVID = 9
+TAG_FSD = 256
+TAG_FID = 257
+TAG_FE = 261
+
+UDF_REVISION = 0x0102
+FIRST_UNIQUE_ID = 16
+# Largest extent a single short_ad can describe, rounded down to whole sectors
+MAX_EXTENT_BYTES = (1 << 30) - SECTOR_SIZE
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def _crc_ccitt(data):
+    """CRC-16/CCITT (polynomial 0x1021, initial value 0) as required for UDF descriptor tags."""
+    crc = 0
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+            crc &= 0xFFFF
+    return crc
+
+
+def _udf_tag(tag_id, location, body):
+    """Prefix a descriptor body with its 16 byte tag (checksum, CRC and location filled in)."""
+    crc = _crc_ccitt(body)
+    tag = bytearray(struct.pack("<HHBBHHHI", tag_id, 2, 0, 0, 0, crc, len(body), location))
+    tag[4] = (sum(tag[0:4]) + sum(tag[5:16])) & 0xFF
+    return bytes(tag) + body
+
+
+def _dstring(text, length):
+    """OSTA CS0 dstring: compression id 8, the characters, padding, and the used length last."""
+    data = text.encode("latin-1")[: length - 2]
+    if not data:
+        return bytes(length)
+    encoded = b"\x08" + data
+    return encoded + bytes(length - 1 - len(encoded)) + bytes([len(encoded)])
+
+
+def _charspec():
+    return b"\x00" + b"OSTA Compressed Unicode".ljust(63, b"\x00")
+
+
+def _regid(identifier, suffix=b""):
+    return b"\x00" + identifier.encode("ascii").ljust(23, b"\x00") + suffix.ljust(8, b"\x00")
+
+
+def _domain_regid():
+    return _regid("*OSTA UDF Compliant", struct.pack("<HB", UDF_REVISION, 0))
+
+
+def _impl_regid():
+    return _regid("*simplified-dvd")
+
+
+def _udf_timestamp(t):
+    tm = time.gmtime(t)
+    # Type 1 (local time) with a UTC offset of 0 minutes
+    return struct.pack("<HhBBBBBBBB", 0x1000, tm.tm_year, tm.tm_mon, tm.tm_mday, tm.tm_hour, tm.tm_min, tm.tm_sec, 0, 0, 0)
+
+
+def _long_ad(length, block):
+    return struct.pack("<IIH6x", length, block, 0)
+
+
+def _both16(value):
+    return struct.pack("<H", value) + struct.pack(">H", value)
+
+
+def _both32(value):
+    return struct.pack("<I", value) + struct.pack(">I", value)
+
+
+def _iso_datetime(t):
+    tm = time.gmtime(t)
+    return bytes([tm.tm_year - 1900, tm.tm_mon, tm.tm_mday, tm.tm_hour, tm.tm_min, tm.tm_sec, 0])
+
+
+def _iso_volume_datetime(t):
+    return time.strftime("%Y%m%d%H%M%S00", time.gmtime(t)).encode("ascii") + b"\x00"
+
+
+def _sectors(size):
+    return (size + SECTOR_SIZE - 1) // SECTOR_SIZE
+
+
+def dvd_video_sort_key(name):
+    """
+    Order VIDEO_TS files the way DVD players expect them on disc:
+    VIDEO_TS.IFO/VOB/BUP first, then each title set as IFO, menu VOB, title VOBs, BUP.
+    dvdauthor computes sector offsets assuming exactly this contiguous layout.
+    """
+    upper = name.upper()
+    stem, _, ext = upper.partition(".")
+    if stem == "VIDEO_TS":
+        title, part = 0, 0
+    elif stem.startswith("VTS_") and len(stem) == 8 and stem[4:6].isdigit() and stem[7].isdigit():
+        title, part = int(stem[4:6]), int(stem[7])
+    else:
+        return (100, 0, upper)
+    rank = {"IFO": 0, "VOB": 1 + part, "BUP": 50}.get(ext, 99)
+    return (title, rank, upper)
+
+
+class _Dir:
+    def __init__(self, name, files):
+        self.name = name
+        self.files = files  # list of _File in data layout order
+        self.iso_sector = 0
+        self.iso_size = 0
+        self.fe_block = 0
+        self.fid_block = 0
+        self.fid_size = 0
+        self.unique_id = 0
+
+
+class _File:
+    def __init__(self, name, path, size, mtime):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+        self.fe_block = 0
+        self.data_sector = 0
+        self.unique_id = 0
+
+
+class DVDImageWriter:
+    """
+    Lays out and writes a DVD-Video UDF bridge image for a DVD folder.
+    dvd_folder: Directory containing VIDEO_TS (and optionally AUDIO_TS), as produced by dvdauthor
+    volume_id: Volume label (upper-cased, at most 32 characters)
+    """
+
+    def __init__(self, dvd_folder, volume_id="DVD_VIDEO"):
+        self.dvd_folder = dvd_folder
+        self.volume_id = "".join(c if c.isalnum() or c == "_" else "_" for c in volume_id.upper())[:32]
+        self.now = time.time()
+        self.dirs = [self._scan_dir("AUDIO_TS"), self._scan_dir("VIDEO_TS")]
+        self.root = _Dir("", [])
+        self._layout()
+
+    def _scan_dir(self, name):
+        path = os.path.join(self.dvd_folder, name)
+        files = []
+        if os.path.isdir(path):
+            for entry in os.listdir(path):
+                full = os.path.join(path, entry)
+                if not os.path.isfile(full):
+                    continue
+                if len(entry) > 12 or entry != entry.upper():
+                    raise ValueError(f"{full} is not a valid DVD-Video file name")
+                st = os.stat(full)
+                files.append(_File(entry, full, st.st_size, st.st_mtime))
+        elif name == "VIDEO_TS":
+            raise FileNotFoundError(f"No VIDEO_TS folder in {self.dvd_folder}")
+        files.sort(key=lambda f: dvd_video_sort_key(f.name))
+        return _Dir(name, files)
+
+    # ISO9660 directory records and path tables
+
+    def _iso_record(self, name_bytes, sector, size, is_dir, mtime):
+        pad = b"\x00" if len(name_bytes) % 2 == 0 else b""
+        length = 33 + len(name_bytes) + len(pad)
+        return (
+            bytes([length, 0])
+            + _both32(sector)
+            + _both32(size)
+            + _iso_datetime(mtime)
+            + bytes([0x02 if is_dir else 0x00, 0, 0])
+            + _both16(1)
+            + bytes([len(name_bytes)])
+            + name_bytes
+            + pad
+        )
+
+    def _iso_dir_records(self, directory, parent):
+        records = [
+            self._iso_record(b"\x00", directory.iso_sector, directory.iso_size, True, self.now),
+            self._iso_record(b"\x01", parent.iso_sector, parent.iso_size, True, self.now),
+        ]
+        if directory is self.root:
+            for d in self.dirs:
+                records.append(self._iso_record(d.name.encode("ascii"), d.iso_sector, d.iso_size, True, self.now))
+        else:
+            # ISO9660 requires directory records sorted by name, independent of the data layout
+            for f in sorted(directory.files, key=lambda f: f.name):
+                records.append(self._iso_record(f"{f.name};1".encode("ascii"), f.data_sector, f.size, False, f.mtime))
+        return records
+
+    def _pack_sectors(self, records):
+        """Concatenate directory records so that none of them crosses a sector boundary."""
+        out = bytearray()
+        for record in records:
+            used = len(out) % SECTOR_SIZE
+            if used + len(record) > SECTOR_SIZE:
+                out += bytes(SECTOR_SIZE - used)
+            out += record
+        out += bytes((-len(out)) % SECTOR_SIZE)
+        return bytes(out)
+
+    def _path_table(self, big_endian):
+        fmt = ">IH" if big_endian else "<IH"
+        table = bytearray()
+        for name, directory in [(b"\x00", self.root)] + [(d.name.encode("ascii"), d) for d in self.dirs]:
+            table += bytes([len(name), 0]) + struct.pack(fmt, directory.iso_sector, 1) + name
+            if len(name) % 2:
+                table += b"\x00"
+        return bytes(table)
+
+    # UDF file identifier descriptors and file entries
+
+    def _fid(self, block_offset, position, characteristics, name, icb_block):
+        name_bytes = b"\x08" + name.encode("latin-1") if name else b""
+        body = struct.pack("<HBB", 1, characteristics, len(name_bytes)) + _long_ad(SECTOR_SIZE, icb_block) + struct.pack("<H", 0) + name_bytes
+        body += bytes((-(16 + len(body))) % 4)
+        return _udf_tag(TAG_FID, block_offset + position // SECTOR_SIZE, body)
+
+    def _dir_fids(self, directory, parent):
+        entries = [(0x0A, "", parent.fe_block)]
+        if directory is self.root:
+            entries += [(0x02, d.name, d.fe_block) for d in self.dirs]
+        else:
+            entries += [(0x00, f.name, f.fe_block) for f in sorted(directory.files, key=lambda f: f.name)]
+        data = bytearray()
+        for characteristics, name, icb_block in entries:
+            data += self._fid(directory.fid_block, len(data), characteristics, name, icb_block)
+        return bytes(data)
+
+    def _file_entry(self, block, is_dir, size, extents, link_count, unique_id, mtime):
+        allocation = b"".join(struct.pack("<II", length, position) for length, position in extents)
+        blocks_recorded = sum(_sectors(length) for length, _ in extents)
+        icb_tag = struct.pack("<IHHHBB6xH", 0, 4, 0, 1, 0, 4 if is_dir else 5, 0)
+        # Read (and for directories, search) permission for owner, group and others
+        perms = 0x14A5 if is_dir else 0x1084
+        stamp = _udf_timestamp(mtime)
+        body = (
+            icb_tag
+            + struct.pack("<IIIHBBI", 0xFFFFFFFF, 0xFFFFFFFF, perms, link_count, 0, 0, 0)
+            + struct.pack("<QQ", size, blocks_recorded)
+            + stamp * 3
+            + struct.pack("<I", 1)
+            + bytes(16)
+            + _impl_regid()
+            + struct.pack("<QII", unique_id, 0, len(allocation))
+            + allocation
+        )
+        return _udf_tag(TAG_FE, block, body)
+
+    @staticmethod
+    def _extents(size, start_block):
+        if size == 0:
+            return []
+        extents = []
+        offset = 0
+        while offset < size:
+            length = min(MAX_EXTENT_BYTES, size - offset)
+            extents.append((length, start_block + offset // SECTOR_SIZE))
+            offset += length
+        return extents
+
+    # Layout
+
+    def _layout(self):
+        all_dirs = [self.root] + self.dirs
+        all_files = [f for d in self.dirs for f in d.files]
+        self.file_count = len(all_files)
+
+        unique_id = FIRST_UNIQUE_ID
+        for item in self.dirs + all_files:
+            item.unique_id = unique_id
+            unique_id += 1
+        self.next_unique_id = unique_id
+
+        # Partition-relative blocks: FSD, its terminator, then one FE per directory and file
+        block = 2
+        for item in all_dirs + all_files:
+            item.fe_block = block
+            block += 1
+
+        # FID sizes do not depend on block numbers, so measure them with placeholders first
+        for d in all_dirs:
+            d.fid_size = len(self._dir_fids(d, self.root))
+            d.fid_block = block
+            block += _sectors(d.fid_size)
+
+        # ISO9660 path tables and directories, also placed inside the partition
+        sector = UDF_PARTITION_START + block
+        self.path_table_size = len(self._path_table(False))
+        self.l_path_table_sector = sector
+        sector += _sectors(self.path_table_size)
+        self.m_path_table_sector = sector
+        sector += _sectors(self.path_table_size)
+        for d in all_dirs:
+            d.iso_size = len(self._pack_sectors(self._iso_dir_records(d, self.root)))
+            d.iso_sector = sector
+            sector += d.iso_size // SECTOR_SIZE
+
+        # File payloads, contiguous and in DVD-Video order
+        self.data_start = sector
+        for f in all_files:
+            f.data_sector = sector
+            sector += _sectors(f.size)
+
+        self.partition_length = sector - UDF_PARTITION_START
+        # A second anchor in the last sector, outside the partition
+        self.total_sectors = sector + 1
+
+    # Volume descriptors
+
+    def _iso_pvd(self):
+        root_record = self._iso_record(b"\x00", self.root.iso_sector, self.root.iso_size, True, self.now)
+        stamp = _iso_volume_datetime(self.now)
+        pvd = (
+            b"\x01CD001\x01\x00"
+            + b" " * 32
+            + self.volume_id.encode("ascii").ljust(32, b" ")
+            + bytes(8)
+            + _both32(self.total_sectors)
+            + bytes(32)
+            + _both16(1)
+            + _both16(1)
+            + _both16(SECTOR_SIZE)
+            + _both32(self.path_table_size)
+            + struct.pack("<II", self.l_path_table_sector, 0)
+            + struct.pack(">II", self.m_path_table_sector, 0)
+            + root_record
+            + b" " * 128 * 3
+            + b"SIMPLIFIED-DVD".ljust(128, b" ")
+            + b" " * (37 * 3)
+            + stamp
+            + stamp
+            + b"0" * 16 + b"\x00"
+            + stamp
+            + b"\x01\x00"
+        )
+        return pvd.ljust(SECTOR_SIZE, b"\x00")
+
+    def _iso_terminator(self):
+        return b"\xffCD001\x01".ljust(SECTOR_SIZE, b"\x00")
+
+    def _volume_recognition(self):
+        return b"".join(
+            (b"\x00" + ident + b"\x01").ljust(SECTOR_SIZE, b"\x00") for ident in (b"BEA01", b"NSR02", b"TEA01")
+        )
+
+    def _udf_vds(self, start):
+        """Main (or reserve) volume descriptor sequence: PVD, IUVD, PD, LVD, USD, TD."""
+        stamp = _udf_timestamp(self.now)
+        volume_set_id = f"{int(self.now):08X}SIMPLIFIED_DVD"
+        pvd = (
+            struct.pack("<II", 0, 0)
+            + _dstring(self.volume_id, 32)
+            + struct.pack("<HHHHII", 1, 1, 2, 2, 1, 1)
+            + _dstring(volume_set_id, 128)
+            + _charspec()
+            + _charspec()
+            + bytes(16)
+            + _impl_regid()
+            + stamp
+            + _impl_regid()
+            + bytes(64)
+            + struct.pack("<IH", 0, 0)
+            + bytes(22)
+        )
+        iuvd_use = (
+            _charspec()
+            + _dstring(self.volume_id, 128)
+            + bytes(36 * 3)
+            + _impl_regid()
+            + bytes(128)
+        )
+        iuvd = struct.pack("<I", 1) + _regid("*UDF LV Info", struct.pack("<H", UDF_REVISION)) + iuvd_use
+        pd = (
+            struct.pack("<IHH", 2, 1, 0)
+            + _regid("+NSR02")
+            + bytes(128)
+            + struct.pack("<III", 1, UDF_PARTITION_START, self.partition_length)
+            + _impl_regid()
+            + bytes(128)
+            + bytes(156)
+        )
+        lvd = (
+            struct.pack("<I", 3)
+            + _charspec()
+            + _dstring(self.volume_id, 128)
+            + struct.pack("<I", SECTOR_SIZE)
+            + _domain_regid()
+            + _long_ad(SECTOR_SIZE, 0)
+            + struct.pack("<II", 6, 1)
+            + _impl_regid()
+            + bytes(128)
+            + struct.pack("<II", SECTOR_SIZE * 2, UDF_LVID_SECTOR)
+            + struct.pack("<BBHH", 1, 6, 1, 0)
+        )
+        usd = struct.pack("<II", 4, 0)
+        descriptors = [(TAG_PVD, pvd), (TAG_IUVD, iuvd), (TAG_PD, pd), (TAG_LVD, lvd), (TAG_USD, usd), (TAG_TD, bytes(496))]
+        return b"".join(
+            _udf_tag(tag_id, start + i, body).ljust(SECTOR_SIZE, b"\x00") for i, (tag_id, body) in enumerate(descriptors)
+        )
+
+    def _udf_lvid(self):
+        impl_use = _impl_regid() + struct.pack("<IIHHH", self.file_count, len(self.dirs), UDF_REVISION, UDF_REVISION, UDF_REVISION)
+        body = (
+            _udf_timestamp(self.now)
+            + struct.pack("<I", 1)
+            + bytes(8)
+            + struct.pack("<Q", self.next_unique_id)
+            + bytes(24)
+            + struct.pack("<II", 1, len(impl_use))
+            + struct.pack("<II", 0, self.partition_length)
+            + impl_use
+        )
+        lvid = _udf_tag(TAG_LVID, UDF_LVID_SECTOR, body).ljust(SECTOR_SIZE, b"\x00")
+        td = _udf_tag(TAG_TD, UDF_LVID_SECTOR + 1, bytes(496)).ljust(SECTOR_SIZE, b"\x00")
+        return lvid + td
+
+    def _udf_anchor(self, sector):
+        body = struct.pack("<IIII", 16 * SECTOR_SIZE, UDF_MAIN_VDS_SECTOR, 16 * SECTOR_SIZE, UDF_RESERVE_VDS_SECTOR) + bytes(480)
+        return _udf_tag(TAG_AVDP, sector, body).ljust(SECTOR_SIZE, b"\x00")
+
+    def _udf_fsd(self):
+        stamp = _udf_timestamp(self.now)
+        body = (
+            stamp
+            + struct.pack("<HHIIII", 3, 3, 1, 1, 0, 0)
+            + _charspec()
+            + _dstring(self.volume_id, 128)
+            + _charspec()
+            + _dstring(self.volume_id, 32)
+            + bytes(32 * 2)
+            + _long_ad(SECTOR_SIZE, self.root.fe_block)
+            + _domain_regid()
+            + bytes(16)
+            + bytes(16)
+            + bytes(32)
+        )
+        fsd = _udf_tag(TAG_FSD, 0, body).ljust(SECTOR_SIZE, b"\x00")
+        td = _udf_tag(TAG_TD, 1, bytes(496)).ljust(SECTOR_SIZE, b"\x00")
+        return fsd + td
+
+    def metadata(self):
+        """Everything that precedes the first file payload, as one bytes object."""
+        out = bytearray(SECTOR_SIZE * ISO_PVD_SECTOR)
+        out += self._iso_pvd()
+        out += self._iso_terminator()
+        out += self._volume_recognition()
+        out += bytes(SECTOR_SIZE * (UDF_MAIN_VDS_SECTOR - len(out) // SECTOR_SIZE))
+        out += self._udf_vds(UDF_MAIN_VDS_SECTOR)
+        out += bytes(SECTOR_SIZE * (UDF_RESERVE_VDS_SECTOR - len(out) // SECTOR_SIZE))
+        out += self._udf_vds(UDF_RESERVE_VDS_SECTOR)
+        out += bytes(SECTOR_SIZE * (UDF_LVID_SECTOR - len(out) // SECTOR_SIZE))
+        out += self._udf_lvid()
+        out += bytes(SECTOR_SIZE * (UDF_ANCHOR_SECTOR - len(out) // SECTOR_SIZE))
+        out += self._udf_anchor(UDF_ANCHOR_SECTOR)
+
+        # Partition contents
+        out += self._udf_fsd()
+        all_files = [f for d in self.dirs for f in d.files]
+        for d in [self.root] + self.dirs:
+            link_count = 1 + (len(self.dirs) if d is self.root else 0)
+            out += self._file_entry(
+                d.fe_block, True, d.fid_size, self._extents(d.fid_size, d.fid_block), link_count, d.unique_id, self.now
+            ).ljust(SECTOR_SIZE, b"\x00")
+        for f in all_files:
+            out += self._file_entry(
+                f.fe_block, False, f.size, self._extents(f.size, f.data_sector - UDF_PARTITION_START), 1, f.unique_id, f.mtime
+            ).ljust(SECTOR_SIZE, b"\x00")
+        for d in [self.root] + self.dirs:
+            fids = self._dir_fids(d, self.root)
+            out += fids + bytes((-len(fids)) % SECTOR_SIZE)
+
+        out += self._path_table(False).ljust(_sectors(self.path_table_size) * SECTOR_SIZE, b"\x00")
+        out += self._path_table(True).ljust(_sectors(self.path_table_size) * SECTOR_SIZE, b"\x00")
+        for d in [self.root] + self.dirs:
+            out += self._pack_sectors(self._iso_dir_records(d, self.root))
+
+        assert len(out) == self.data_start * SECTOR_SIZE
+        return bytes(out)
+
+    def write(self, out_fd):
+        """Write the complete image sequentially to the open file descriptor out_fd."""
+        _write_all(out_fd, self.metadata())
+        for d in self.dirs:
+            for f in d.files:
+                _copy_file_to_fd(f.path, f.size, out_fd)
+                padding = (-f.size) % SECTOR_SIZE
+                if padding:
+                    _write_all(out_fd, bytes(padding))
+        _write_all(out_fd, self._udf_anchor(self.total_sectors - 1))
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _copy_file_to_fd(path, size, out_fd):
+    """Copy path into out_fd, kernel-side via sendfile when available."""
+    with open(path, "rb") as src:
+        offset = 0
+        if hasattr(os, "sendfile"):
+            try:
+                while offset < size:
+                    sent = os.sendfile(out_fd, src.fileno(), offset, min(COPY_CHUNK_SIZE, size - offset))
+                    if sent == 0:
+                        break
+                    offset += sent
+            except OSError:
+                # Some platforms only allow sockets as the sendfile target
+                pass
+        if offset < size:
+            src.seek(offset)
+            buf = bytearray(COPY_CHUNK_SIZE)
+            while offset < size:
+                n = src.readinto(buf)
+                if not n:
+                    break
+                _write_all(out_fd, memoryview(buf)[:n])
+                offset += n
+        if offset != size:
+            raise IOError(f"{path} changed size while writing the image")
+
+
+def write_dvd_iso(dvd_folder, iso_output, volume_id="DVD_VIDEO"):
+    """
+    Master the DVD folder into a DVD-Video ISO without genisoimage.
+    dvd_folder: Folder containing VIDEO_TS (e.g. 'dvd_workdir/DVD')
+    iso_output: Output ISO path, or '-' to stream the image to stdout
+    volume_id: Volume label
+
+    Returns the number of bytes written.
+    """
+    writer = DVDImageWriter(dvd_folder, volume_id=volume_id)
+    if iso_output == "-":
+        sys.stdout.flush()
+        writer.write(sys.stdout.fileno())
+    else:
+        logger.info(f"Writing ISO image to {iso_output}...")
+        tmp_path = f"{iso_output}.partial"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            writer.write(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, iso_output)
+    return writer.total_sectors * SECTOR_SIZE
+
+
+def find_iso_tool():
+    """Return 'genisoimage' or 'mkisofs' if one is installed, otherwise None."""
+    for tool in ("genisoimage", "mkisofs"):
+        if shutil.which(tool):
+            return tool
+    return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python isowriter.py <DVD folder> <output.iso | -> [volume id]", file=sys.stderr)
+        sys.exit(2)
+    write_dvd_iso(sys.argv[1], sys.argv[2], *sys.argv[3:])
@@ -1,97 +1,396 @@
 import os
+import shlex
 import shutil
 import subprocess
+from xml.sax.saxutils import quoteattr
 
 from loguru import logger
 
+from cache import TranscodeCache
+from encoder import (
+    DEFAULT_CHAPTER_INTERVAL,
+    ENCODE_COPY,
+    ENCODE_FULL,
+    choose_encode_mode,
+    dvd_encode_args,
+    encode_segmented,
+    estimate_mpeg_bytes,
+    encode_split,
+    ffmpeg_dvd_stream_command,
+    ffmpeg_remux_command,
+    has_audio_stream,
+    parse_audio_track,
+    plan_chapters,
+)
+from isowriter import find_iso_tool, write_dvd_iso
+from manifest import StageManifest, stat_fingerprint
+from metrics import PipelineMetrics, run_ffmpeg_with_progress
+from probe import get_duration, get_keyframes, get_streams
+from scratch import check_space, estimate_build_space, place_file, same_filesystem
 
-def run_for_linux(burn, iso, burn_drive, iso_output, file_path):
+
+def run_for_linux(burn, iso, burn_drive, iso_output, file_path, workdir="dvd_workdir", use_cache=True, segmented=False, streaming=False, make_iso=True, native_iso=False, metrics_path=None, passthrough=True, resume=False, audio_tracks=None, chapter_interval=DEFAULT_CHAPTER_INTERVAL, on_event=None):
     """
     burn: Boolean, whether to burn to DVD device
     iso: Path to DVD XML file (e.g., 'dvd.xml')
     burn_drive: DVD device path (e.g., '/dev/sr0'), or None to skip burning
-    iso_output: Path for the output ISO file (e.g., 'dvd_image.iso')
+    iso_output: Path for the output ISO file (e.g., 'dvd_image.iso'), relative to the current directory
     file_path: Path to input video file (e.g., 'input_video.mp4')
+    workdir: Scratch directory for this build, wiped at the start unless resuming (one per concurrent job);
+        may live on another filesystem such as a tmpfs (see scratch.py)
+    use_cache: Reuse a previously transcoded output.mpg for the same input and ffmpeg parameters
+    segmented: Encode keyframe-aligned chunks in parallel on all cores and join them losslessly
+    streaming: Pipe ffmpeg's output straight into dvdauthor instead of writing output.mpg first
+    make_iso: Write an ISO file; when False and burning, growisofs masters the DVD folder on the fly
+    native_iso: Master the ISO with the built-in writer (isowriter.py) instead of genisoimage;
+        also used automatically when genisoimage/mkisofs is not installed
+    metrics_path: JSON lines file for per-stage timings and ffmpeg progress
+        (defaults to metrics.jsonl in the workdir)
+    passthrough: Probe the input and stream-copy whatever is already DVD compliant instead of re-encoding
+    resume: Keep the workdir and skip every stage whose recorded inputs and outputs are unchanged
+        (see manifest.py); burning always runs
+    audio_tracks: Extra audio tracks as 'path[:lang]' specs (e.g. 'commentary.m4a:en'), muxed after
+        the input's own audio without re-encoding the video
+    chapter_interval: Seconds between automatic chapter marks, snapped to scene cuts/keyframes
+        of the input (0 or None for no chapters)
+    on_event: Optional callable receiving every metrics record (stage start/end, ffmpeg progress)
+
+    Returns the absolute path of the created ISO (or of the authored DVD folder when burning
+    directly without an ISO), or None if a step failed.
     """
-    WORKDIR = "dvd_workdir"
+    WORKDIR = os.path.abspath(workdir)
     OUTPUT_MPG = os.path.join(WORKDIR, "output.mpg")
 
-    # Ensure workdir exists and is clean
-    if os.path.exists(WORKDIR):
+    # Ensure workdir exists and is clean (a resumed build keeps it and its stage manifest)
+    if os.path.exists(WORKDIR) and not resume:
         shutil.rmtree(WORKDIR)
     os.makedirs(WORKDIR, exist_ok=True)
 
+    metrics = PipelineMetrics(
+        metrics_path or os.path.join(WORKDIR, "metrics.jsonl"), job=os.path.basename(file_path), listener=on_event
+    )
+
     # Ensure VIDEO_FORMAT is set to NTSC for dvdauthor compatibility
     os.environ["VIDEO_FORMAT"] = "NTSC"
 
-    # Step 1: Convert video to NTSC DVD MPEG-2
-    logger.info("Converting video to NTSC DVD MPEG-2...")
-    ffmpeg_cmd = [
-        "ffmpeg",
-        "-i",
-        file_path,
-        "-target",
-        "ntsc-dvd",
-        "-b:v",
-        "1800k",
-        OUTPUT_MPG,
-    ]
-    ffmpeg_result = subprocess.run(ffmpeg_cmd)
-    if ffmpeg_result.returncode != 0:
-        logger.error("ffmpeg failed to create output.mpg!")
-        return
-    if not os.path.exists(OUTPUT_MPG):
-        logger.error(f"ERROR: {OUTPUT_MPG} was not created!")
-        return
+    extra_audio = [parse_audio_track(spec) for spec in audio_tracks or []]
+    if extra_audio and streaming:
+        logger.warning("Extra audio tracks are muxed into output.mpg, streaming mode is disabled.")
+        streaming = False
+
+    # Default iso_output if not provided; relative paths are relative to where the tool was started
+    if not iso_output:
+        iso_output = "dvd.iso"
+        if make_iso:
+            logger.info(f"No ISO output path specified. Defaulting to {iso_output}")
+    iso_output = os.path.abspath(iso_output)
+    # Master inside the workdir and rename into place when both share a filesystem; otherwise
+    # (e.g. a tmpfs workdir) write straight next to the destination so the ISO never sits in RAM
+    iso_on_scratch = same_filesystem(WORKDIR, os.path.dirname(iso_output))
+    staged_iso = os.path.join(WORKDIR, "dvd.iso") if iso_on_scratch else f"{iso_output}.partial"
+
+    if not resume and not _preflight_space(
+        file_path, WORKDIR, iso_output, streaming, make_iso, iso_on_scratch, passthrough, len(extra_audio)
+    ):
+        return None
+
+    # Step 1: Convert video to NTSC DVD MPEG-2 (remux if already compliant, or reuse a cached transcode)
+    manifest = StageManifest(WORKDIR)
+    encode_inputs = StageManifest.fingerprint(
+        input=stat_fingerprint(file_path), args=dvd_encode_args(), segmented=segmented, passthrough=passthrough,
+        audio=[stat_fingerprint(path) for path, _ in extra_audio]
+    )
+    pipe_command = None
+    if resume and not streaming and manifest.is_valid("encode", encode_inputs):
+        logger.info("Resuming: output.mpg is still valid, skipping the encode.")
+    else:
+        manifest.invalidate("encode")
+        # A rerun starts from scratch: ffmpeg's remux refuses to overwrite, and truncating an
+        # output.mpg that is hard-linked into the transcode cache would corrupt the cache entry
+        if os.path.exists(OUTPUT_MPG):
+            os.remove(OUTPUT_MPG)
+        for leftover in ("streams", "segments"):
+            shutil.rmtree(os.path.join(WORKDIR, leftover), ignore_errors=True)
+        ok, pipe_command = _encode_step(
+            file_path, OUTPUT_MPG, WORKDIR, metrics, use_cache, segmented, streaming, passthrough,
+            extra_audio=[path for path, _ in extra_audio]
+        )
+        if not ok:
+            return None
+        if pipe_command is None:
+            manifest.record("encode", encode_inputs, [OUTPUT_MPG])
 
     # Step 1.5: Create DVD XML file directly in WORKDIR
     logger.info("Creating DVD XML file...")
     dvd_xml_path = os.path.join(WORKDIR, "dvd.xml")
-    create_dvd_xml(dvd_xml_path, video_filename="output.mpg")
+    audio_langs = None
+    if any(lang for _, lang in extra_audio):
+        # The input's own audio comes first, but only if it has any (see encoder.encode_split)
+        audio_langs = ([None] if has_audio_stream(file_path) else []) + [lang for _, lang in extra_audio]
+    chapters = _plan_chapters(file_path, chapter_interval)
+    create_dvd_xml(
+        dvd_xml_path, video_filename="output.mpg", pipe_command=pipe_command, audio_langs=audio_langs,
+        chapters=[chapters] if chapters else None
+    )
 
-    # Create DVD output subfolder
     DVD_FOLDER = os.path.join(WORKDIR, "DVD")
-    os.makedirs(DVD_FOLDER, exist_ok=True)
+    with open(dvd_xml_path, "r", encoding="utf-8") as f:
+        dvd_xml_content = f.read()
+    author_inputs = StageManifest.fingerprint(
+        encode=manifest.digest("encode") if pipe_command is None else encode_inputs, xml=dvd_xml_content
+    )
 
     # Step 2: Author DVD structure (run from WORKDIR)
-    logger.info("Authoring DVD structure...")
-    dvdauthor_cmd = ["dvdauthor", "-o", "DVD", "-x", "dvd.xml"]
-    subprocess.run(dvdauthor_cmd, check=True, cwd=WORKDIR)
+    if resume and manifest.is_valid("author", author_inputs):
+        logger.info("Resuming: DVD folder is still valid, skipping dvdauthor.")
+    else:
+        manifest.invalidate("author")
+        # Create a fresh DVD output subfolder
+        if os.path.exists(DVD_FOLDER):
+            shutil.rmtree(DVD_FOLDER)
+        os.makedirs(DVD_FOLDER)
+        logger.info("Authoring DVD structure...")
+        with metrics.stage("author", output_path=DVD_FOLDER):
+            subprocess.run(dvdauthor_command(), check=True, cwd=WORKDIR)
+        manifest.record("author", author_inputs, [DVD_FOLDER])
+
+    # Burn-on-the-fly: let growisofs build the filesystem straight from the DVD folder
+    if not make_iso:
+        if not (burn and burn_drive):
+            logger.info(f"ISO creation and burning skipped. DVD folder is at {os.path.abspath(DVD_FOLDER)}.")
+            metrics.summary()
+            return os.path.abspath(DVD_FOLDER)
+        logger.info(f"Burning DVD folder directly to DVD device {burn_drive} (no ISO file)...")
+        with metrics.stage("burn", output_path=DVD_FOLDER):
+            subprocess.run(growisofs_command(burn_drive, dvd_folder="DVD"), check=True, cwd=WORKDIR)
+        logger.info("DVD creation and burning complete.")
+        metrics.summary()
+        return os.path.abspath(DVD_FOLDER)
 
     # Step 3: Create ISO from DVD folder
-    logger.info("Creating ISO image...")
-    # Default iso_output if not provided
-    if not iso_output:
-        iso_output = "dvd.iso"
-        logger.info(f"No ISO output path specified. Defaulting to {iso_output}")
-    # If iso_output is an absolute path, use as is; otherwise, treat as relative to WORKDIR when running genisoimage
-    genisoimage_output = iso_output if os.path.isabs(iso_output) else os.path.join(WORKDIR, iso_output)
-    genisoimage_output = os.path.abspath(genisoimage_output)
-    logger.info(f"Creating ISO at {genisoimage_output}")
-    genisoimage_cmd = ["genisoimage", "-o", genisoimage_output, "-dvd-video", os.path.join("DVD")]
-    subprocess.run(genisoimage_cmd, check=True, cwd=WORKDIR)
+    logger.info(f"Creating ISO image at {iso_output}...")
+    iso_tool = None if native_iso else find_iso_tool()
+    master_inputs = StageManifest.fingerprint(author=manifest.digest("author"), output=iso_output, tool=iso_tool)
+    if resume and manifest.is_valid("master", master_inputs):
+        logger.info(f"Resuming: {iso_output} is still valid, skipping ISO creation.")
+    else:
+        manifest.invalidate("master")
+        os.makedirs(os.path.dirname(iso_output), exist_ok=True)
+        with metrics.stage("master", output_path=staged_iso):
+            if iso_tool:
+                subprocess.run(iso_command(iso_tool, staged_iso), check=True, cwd=WORKDIR)
+            else:
+                write_dvd_iso(DVD_FOLDER, staged_iso)
+        method = place_file(staged_iso, iso_output)
+        logger.info(f"Placed the ISO at {iso_output} ({method})")
+        manifest.record("master", master_inputs, [iso_output])
 
     # Step 5: Burn ISO to DVD if burn is True and device is specified
     if burn and burn_drive:
-        # Use absolute path for ISO file
-        iso_abspath = os.path.abspath(genisoimage_output)
         logger.info(f"Burning ISO to DVD device {burn_drive}...")
-        growisofs_cmd = ["growisofs", "-dvd-compat", "-Z", f"{burn_drive}={iso_abspath}"]
-        subprocess.run(growisofs_cmd, check=True)
+        with metrics.stage("burn", output_path=iso_output):
+            subprocess.run(growisofs_command(burn_drive, iso_path=iso_output), check=True)
         logger.info("DVD creation and burning complete.")
     else:
-        logger.info(f"Burning skipped. DVD ISO is at {genisoimage_output}.")
+        logger.info(f"Burning skipped. DVD ISO is at {iso_output}.")
+    metrics.summary()
+    return iso_output
+
+
+def _encode_step(file_path, output_mpg, workdir, metrics, use_cache, segmented, streaming, passthrough, extra_audio=()):
+    """
+    Produce output_mpg from file_path: remux if already compliant, reuse a cached transcode, or encode.
+    In streaming mode nothing is written and the ffmpeg command for dvdauthor's pipe is returned instead.
+    Video and audio are encoded by separate concurrent ffmpeg processes and muxed at the end,
+    so extra_audio files are added as further tracks without touching the video.
+
+    Returns (success, pipe_command).
+    """
+    pipe_command = None
+    with metrics.stage("encode", output_path=output_mpg) as stage:
+        encode_mode = ENCODE_FULL
+        if passthrough:
+            try:
+                encode_mode = choose_encode_mode(get_streams(file_path))
+            except (OSError, subprocess.CalledProcessError, ValueError):
+                logger.warning("Could not probe the input streams, falling back to a full encode.")
+        stage["mode"] = encode_mode
 
+        if encode_mode != ENCODE_FULL:
+            if encode_mode == ENCODE_COPY:
+                logger.info("Input is already DVD compliant, remuxing without re-encoding...")
+            else:
+                logger.info("Input video is DVD compliant, copying it and transcoding only the audio...")
+            if streaming:
+                pipe_command = ffmpeg_remux_command(os.path.abspath(file_path), "-", encode_mode)
+                stage["status"] = "streamed"
+            elif extra_audio:
+                if not encode_split(
+                    file_path, output_mpg, workdir, extra_audio, mode=encode_mode, metrics=metrics,
+                    duration=_probe_duration(file_path)
+                ):
+                    stage["status"] = "failed"
+                    return False, None
+            else:
+                returncode = run_ffmpeg_with_progress(
+                    ffmpeg_remux_command(file_path, output_mpg, encode_mode), metrics, duration=_probe_duration(file_path)
+                )
+                if returncode != 0 or not os.path.exists(output_mpg):
+                    logger.error("ffmpeg failed to remux the input!")
+                    stage["status"] = "failed"
+                    return False, None
+        else:
+            # The key names this pipeline (first input track plus the extra tracks, see encode_split), so
+            # it never matches the single-process ffmpeg_dvd_command outputs cached by the other modes
+            cache = TranscodeCache() if use_cache else None
+            cache_key = None
+            if cache:
+                cache_args = dvd_encode_args() + ["segmented" if segmented else "split"]
+                cache_args += [f"audio={cache.key(path, [])}" for path in extra_audio]
+                cache_key = cache.key(file_path, cache_args)
+            if cache and cache.fetch(cache_key, output_mpg):
+                logger.info("Transcode cache hit, skipping ffmpeg.")
+                stage["status"] = "cached"
+            elif streaming:
+                # dvdauthor runs ffmpeg itself and reads the program stream from the pipe
+                logger.info("Streaming ffmpeg output directly into dvdauthor...")
+                pipe_command = ffmpeg_dvd_stream_command(os.path.abspath(file_path))
+                stage["status"] = "streamed"
+            else:
+                logger.info("Converting video to NTSC DVD MPEG-2...")
+                if segmented:
+                    ok = encode_segmented(file_path, output_mpg, workdir, extra_audio=extra_audio)
+                else:
+                    ok = encode_split(
+                        file_path, output_mpg, workdir, extra_audio, metrics=metrics, duration=_probe_duration(file_path)
+                    )
+                if not ok:
+                    stage["status"] = "failed"
+                    return False, None
+                if not os.path.exists(output_mpg):
+                    logger.error(f"ERROR: {output_mpg} was not created!")
+                    stage["status"] = "failed"
+                    return False, None
+                if cache:
+                    cache.store(cache_key, output_mpg)
+    return True, pipe_command
 
-def create_dvd_xml(xml_path, video_filename="output.mpg"):
+
+def _preflight_space(file_path, workdir, iso_output, streaming, make_iso, iso_on_scratch, passthrough, extra_audio_tracks):
+    """
+    Estimate the scratch and destination space of the build from the input duration and the encode
+    bitrate (or the input size for a remux), and check it before any work is done.
+    Returns False if a filesystem is too small.
+    """
+    duration = _probe_duration(file_path)
+    if duration is None:
+        logger.warning("Could not probe the input duration, skipping the free space check.")
+        return True
+    mpeg_bytes = estimate_mpeg_bytes(duration, audio_tracks=1 + extra_audio_tracks)
+    if passthrough:
+        try:
+            if choose_encode_mode(get_streams(file_path)) != ENCODE_FULL:
+                mpeg_bytes = os.path.getsize(file_path)
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            pass
+    scratch_bytes, destination_bytes = estimate_build_space(mpeg_bytes, streaming, make_iso, iso_on_scratch)
+    logger.info(
+        f"Estimated space: {scratch_bytes / 1e9:.2f} GB scratch in {workdir}"
+        + (f", {destination_bytes / 1e9:.2f} GB for {iso_output}" if destination_bytes else "")
+    )
+    shortfalls = check_space([(workdir, scratch_bytes), (os.path.dirname(iso_output), destination_bytes)])
+    for path, needed, free in shortfalls:
+        logger.error(
+            f"Not enough space for {path}: about {needed / 1e9:.2f} GB needed, {free / 1e9:.2f} GB free. "
+            "Free some space or use --scratch-dir."
+        )
+    return not shortfalls
+
+
+def _plan_chapters(file_path, interval):
+    """Automatic chapter marks from the probe index, or None when disabled or unknown."""
+    if not interval:
+        return None
+    try:
+        chapters = plan_chapters(get_keyframes(file_path), get_duration(file_path), interval)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        logger.warning("Could not read the input keyframes, authoring without chapters.")
+        return None
+    if len(chapters) > 1:
+        logger.info(f"Adding {len(chapters)} chapters")
+    return chapters
+
+
+def format_chapter_time(seconds):
+    """dvdauthor chapter timestamp (h:mm:ss.sss)."""
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{secs:06.3f}"
+
+
+def _probe_duration(file_path):
+    """Input duration for progress percentages, or None if ffprobe cannot tell."""
+    try:
+        return get_duration(file_path) or None
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def dvdauthor_command(dvd_folder="DVD", xml_path="dvd.xml"):
+    """dvdauthor command that authors xml_path into dvd_folder (paths relative to the workdir)."""
+    return ["dvdauthor", "-o", dvd_folder, "-x", xml_path]
+
+
+def iso_command(iso_tool, iso_output, dvd_folder="DVD"):
+    """genisoimage/mkisofs command that masters dvd_folder into iso_output."""
+    return [iso_tool, "-o", iso_output, "-dvd-video", dvd_folder]
+
+
+def growisofs_command(burn_drive, iso_path=None, dvd_folder=None):
+    """growisofs command that burns iso_path, or masters dvd_folder on the fly, to burn_drive."""
+    if iso_path:
+        return ["growisofs", "-dvd-compat", "-Z", f"{burn_drive}={iso_path}"]
+    return ["growisofs", "-dvd-compat", "-Z", burn_drive, "-dvd-video", dvd_folder]
+
+
+def create_dvd_xml(xml_path, video_filename="output.mpg", pipe_command=None, titles=None, audio_langs=None, chapters=None):
+    """
+    xml_path: Where to write the dvdauthor XML
+    video_filename: MPEG program stream to author, relative to the XML's directory
+    pipe_command: Optional command (argument list) whose stdout is the program stream;
+        when given, dvdauthor runs it and reads from the pipe instead of video_filename
+    titles: Optional list of program streams authored as consecutive titles that play
+        one after the other; replaces video_filename
+    audio_langs: Optional language code (or None) per audio track, shown by players when switching tracks
+    chapters: Optional chapter start times in seconds, one list (or None) per title
+    """
+    if titles:
+        vob_sources = list(titles)
+    elif pipe_command:
+        # dvdauthor treats a file name ending in '|' as a shell command to read from
+        vob_sources = [" ".join(shlex.quote(arg) for arg in pipe_command) + " |"]
+    else:
+        vob_sources = [video_filename]
+    pgcs = []
+    for number, vob_source in enumerate(vob_sources, start=1):
+        post = f"\n        <post>jump title {number + 1};</post>" if number < len(vob_sources) else ""
+        title_chapters = chapters[number - 1] if chapters and number <= len(chapters) else None
+        chapter_attr = ""
+        if title_chapters:
+            chapter_attr = f" chapters={quoteattr(','.join(format_chapter_time(t) for t in title_chapters))}"
+        pgcs.append(f"""      <pgc>
+        <vob file={quoteattr(vob_source)}{chapter_attr} />{post}
+      </pgc>""")
+    pgcs = "\n".join(pgcs)
+    if audio_langs:
+        audio = [f"      <audio lang={quoteattr(lang)} />" if lang else "      <audio />" for lang in audio_langs]
+        pgcs = "\n".join(audio) + "\n" + pgcs
     dvd_xml_content = f"""
 <dvdauthor>
   <vmgm />
   <titleset>
     <titles>
-      <pgc>
-        <vob file=\"{video_filename}\" />
-      </pgc>
+{pgcs}
     </titles>
   </titleset>
 </dvdauthor>
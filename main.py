@@ -1,14 +1,12 @@
-import glob
+import os
 import platform
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-from typing import Optional
+from typing import List, Optional
 
 import typer
 from loguru import logger
 
-from linux import run_for_linux
-from windows import get_optical_drives, run_for_windows, run_isoburn_step
+# The pipeline modules, tkinter and the Windows drive APIs are imported where they are used, so a
+# scripted `--file-path` run only loads what its own code path needs
 
 app = typer.Typer()
 
@@ -16,40 +14,162 @@ app = typer.Typer()
 def main(
     burn: bool = typer.Option(False, "--burn", help="Burn the ISO to DVD device"),
     iso: bool = typer.Option(False, "--iso", help="Create an ISO image from the DVD folder"),
-    preview: bool = typer.Option(False, "--preview", help="Preview the output with VLC"),
+    preview: bool = typer.Option(False, "--preview", help="Encode a few sampled seconds with the DVD settings and open them in a player"),
     file_path: Optional[str] = typer.Option(None, "--file-path", help="Optional file path for the input video"),
-    iso_output: Optional[str] = typer.Option(None, "--iso-output", help="Optional output path for the ISO image")
+    iso_output: Optional[str] = typer.Option(None, "--iso-output", help="Optional output path for the ISO image"),
+    burn_drive: Optional[str] = typer.Option(None, "--burn-drive", help="DVD device to burn to (e.g. /dev/sr0 or E:)"),
+    manifest: Optional[str] = typer.Option(None, "--manifest", help="Batch mode: text file with one input video per line"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", help="Batch mode: number of parallel jobs (defaults to CPU count)"),
+    output_dir: str = typer.Option(".", "--output-dir", help="Batch mode: directory for the generated ISO files"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always re-encode instead of reusing cached transcodes"),
+    segmented: bool = typer.Option(False, "--segmented", help="Encode keyframe-aligned chunks in parallel on all cores (Linux)"),
+    stream: bool = typer.Option(False, "--stream", help="Pipe ffmpeg straight into dvdauthor without writing output.mpg (Linux)"),
+    native_iso: bool = typer.Option(False, "--native-iso", help="Write the ISO with the built-in writer instead of genisoimage (Linux; always used on Windows)"),
+    pipelined: bool = typer.Option(False, "--pipelined", help="Batch mode: overlap encode, authoring, mastering and burning across jobs (Linux)"),
+    disk_slots: int = typer.Option(2, "--disk-slots", help="Pipelined batch mode: concurrent dvdauthor/ISO steps"),
+    force_encode: bool = typer.Option(False, "--force-encode", help="Always re-encode, even if the input is already DVD compliant (Linux)"),
+    resume: bool = typer.Option(False, "--resume", help="Reuse the previous workdir and skip stages whose outputs are still valid (Linux)"),
+    duplicate: Optional[List[str]] = typer.Option(None, "--duplicate", help="Burn the ISO to each of these drives at once (repeatable, Linux)"),
+    no_verify: bool = typer.Option(False, "--no-verify", help="Duplication mode: skip reading the discs back"),
+    pack: bool = typer.Option(False, "--pack", help="Batch mode: pack all titles onto the fewest multi-title discs (Linux)"),
+    project: Optional[str] = typer.Option(None, "--project", help="Batch mode: build the manifest's videos as the titles of one disc, keeping their encodes in this directory so rebuilds only encode changed titles (Linux)"),
+    span: bool = typer.Option(False, "--span", help="Split a long --file-path input across as many discs as it needs, one ISO per part in --output-dir (Linux)"),
+    disc_size: str = typer.Option("dvd5", "--disc-size", help="Pack/span/project mode: dvd5 (4.7 GB) or dvd9 (8.5 GB)"),
+    audio_track: Optional[List[str]] = typer.Option(None, "--audio-track", help="Extra audio track as PATH[:LANG], e.g. commentary.m4a:en (repeatable, Linux)"),
+    autotune: bool = typer.Option(False, "--autotune", help="Calibrate the encoder settings for this host on the input first and save them"),
+    preview_output: Optional[str] = typer.Option(None, "--preview-output", help="Write the --preview clip to this file instead of opening a player"),
+    chapter_minutes: float = typer.Option(5.0, "--chapter-minutes", help="Minutes between automatic chapter marks, 0 for none (Linux)"),
+    scratch_dir: Optional[str] = typer.Option(None, "--scratch-dir", help="Where the workdirs live, e.g. a tmpfs or NVMe volume (default: $SIMPLIFIED_DVD_SCRATCH or the current directory)")
 ):
     logger.info("Welcome!")
+    if manifest is not None:
+        logger.info(f"Batch manifest provided: {manifest}")
+        from batch import BATCH_WORKROOT, read_manifest, run_batch
+        from scratch import scratch_path
+        if project:
+            from discpack import DISC_SIZES
+            from project import run_project
+            if disc_size not in DISC_SIZES:
+                logger.error(f"Unknown disc size {disc_size}, use one of: {', '.join(DISC_SIZES)}")
+                return
+            run_project(
+                read_manifest(manifest),
+                project,
+                iso_output=iso_output,
+                disc_size=disc_size,
+                use_cache=not no_cache,
+                jobs=jobs or 2,
+                native_iso=native_iso,
+                chapter_interval=chapter_minutes * 60
+            )
+        elif pack:
+            from discpack import DISC_SIZES, PACK_WORKROOT, run_packed
+            if disc_size not in DISC_SIZES:
+                logger.error(f"Unknown disc size {disc_size}, use one of: {', '.join(DISC_SIZES)}")
+                return
+            run_packed(
+                read_manifest(manifest),
+                output_dir=output_dir,
+                disc_size=disc_size,
+                use_cache=not no_cache,
+                jobs=jobs or 2,
+                native_iso=native_iso,
+                workroot=scratch_path(PACK_WORKROOT, scratch_dir),
+                chapter_interval=chapter_minutes * 60
+            )
+        elif pipelined:
+            from scheduler import run_pipelined
+            run_pipelined(
+                read_manifest(manifest),
+                output_dir=output_dir,
+                cpu_slots=jobs,
+                disk_slots=disk_slots,
+                burn_drives=[burn_drive] if burn and burn_drive else None,
+                use_cache=not no_cache,
+                workroot=scratch_path(BATCH_WORKROOT, scratch_dir)
+            )
+        else:
+            run_batch(
+                read_manifest(manifest),
+                output_dir=output_dir,
+                max_workers=jobs,
+                workroot=scratch_path(BATCH_WORKROOT, scratch_dir),
+                use_cache=not no_cache,
+                resume=resume
+            )
+        return
     if file_path is None:
         logger.info("No file path provided, all other flags will be ignored.")
-        gui_opts = run_with_gui()
-        run_with_cli(
-            burn=gui_opts['burn'],
-            iso=gui_opts['iso'],
-            preview=False,  # GUI does not support preview yet
-            file_path=None,  # GUI does not select input file yet
-            iso_output=gui_opts['iso_output']
-        )
+        # The GUI's worker process runs the whole queue
+        run_with_gui()
         return
     else:
         logger.info(f"File path provided: {file_path}")
+        if autotune:
+            from autotune import calibrate
+            calibrate(file_path)
+        if span:
+            if platform.system() != "Linux":
+                logger.error("Spanning mode is only supported on Linux.")
+                return
+            from discpack import DISC_SIZES
+            from scratch import scratch_path
+            from span import SPAN_WORKROOT, run_spanned
+            if disc_size not in DISC_SIZES:
+                logger.error(f"Unknown disc size {disc_size}, use one of: {', '.join(DISC_SIZES)}")
+                return
+            run_spanned(
+                file_path,
+                output_dir=output_dir,
+                disc_size=disc_size,
+                jobs=jobs or 1,
+                native_iso=native_iso,
+                chapter_interval=chapter_minutes * 60,
+                workroot=scratch_path(SPAN_WORKROOT, scratch_dir)
+            )
+            return
         run_with_cli(
             burn=burn,
             iso=iso,
             preview=preview,
             file_path=file_path,
-            iso_output=iso_output
+            iso_output=iso_output,
+            burn_drive=burn_drive,
+            use_cache=not no_cache,
+            segmented=segmented,
+            streaming=stream,
+            native_iso=native_iso,
+            passthrough=not force_encode,
+            resume=resume,
+            duplicate_drives=duplicate,
+            verify=not no_verify,
+            audio_tracks=audio_track,
+            preview_output=preview_output,
+            chapter_interval=chapter_minutes * 60,
+            scratch_dir=scratch_dir
         )
 
 def run_with_gui():
-    """Run the application in GUI mode."""
+    """
+    Run the application in GUI mode.
+    The queued videos are built one after another by a background worker process (see guiworker.py);
+    the window stays responsive and shows the current stage, its progress and ETA.
+    """
+    import queue
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+
+    from drives import list_optical_drives
+    from guiworker import INSERT_DISC, JOB_START, QUEUE_DONE, cancel_worker, start_worker
+
     selected_options = {
         'burn': False,
         'iso': False,
         'burn_drive': None,
-        'iso_output': None
+        'output_dir': None,
+        'results': []
     }
+    worker = {'process': None, 'events': None, 'disc_ready': None, 'cancelled': False}
 
     def on_burn_checked():
         if burn_var.get():
@@ -60,26 +180,154 @@ def run_with_gui():
 
     def on_iso_checked():
         if iso_var.get():
-            iso_file_btn.config(state=tk.NORMAL)
+            iso_dir_btn.config(state=tk.NORMAL)
         else:
-            iso_file_btn.config(state=tk.DISABLED)
-            iso_file_path.set("")
+            iso_dir_btn.config(state=tk.DISABLED)
+            iso_dir_path.set("")
 
-    def pick_iso_file():
-        path = filedialog.asksaveasfilename(title="Select ISO output file", defaultextension=".iso", filetypes=[("ISO files", "*.iso")])
+    def pick_iso_dir():
+        path = filedialog.askdirectory(title="Select ISO output folder")
         if path:
-            iso_file_path.set(path)
+            iso_dir_path.set(path)
 
-    def pick_video_file():
-        path = filedialog.askopenfilename(title="Select input video file", filetypes=[("MP4 files", "*.mp4")])
-        if path:
-            video_file_path.set(path)
+    def add_videos():
+        paths = filedialog.askopenfilenames(title="Select input video files", filetypes=[("MP4 files", "*.mp4"), ("All files", "*.*")])
+        for path in paths:
+            if path not in video_list.get(0, tk.END):
+                video_list.insert(tk.END, path)
+
+    def remove_videos():
+        for index in reversed(video_list.curselection()):
+            video_list.delete(index)
+
+    def format_eta(seconds):
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+    def set_running(running):
+        state = tk.DISABLED if running else tk.NORMAL
+        for widget in (add_btn, remove_btn, burn_cb, iso_cb, quit_btn):
+            widget.config(state=state)
+        continue_btn.config(state=state, text="Running..." if running else "Continue")
+        cancel_btn.config(state=tk.NORMAL if running else tk.DISABLED)
+        if running:
+            return
+        on_burn_checked()
+        on_iso_checked()
+        progress_bar.stop()
+        progress_bar.config(mode="determinate", value=0)
+        eta_var.set("")
+
+    def handle_event(event):
+        kind = event.get("event")
+        if kind == JOB_START:
+            job_var.set(f"Video {event['number']}/{event['total']}: {os.path.basename(event['file_path'])}")
+        elif kind == "stage_start":
+            stage_var.set(f"{event['stage'].capitalize()}...")
+            eta_var.set("")
+            progress_bar.config(mode="indeterminate")
+            progress_bar.start(15)
+        elif kind == "progress" and "percent" in event:
+            if str(progress_bar.cget("mode")) != "determinate":
+                progress_bar.stop()
+                progress_bar.config(mode="determinate")
+            progress_bar.config(value=event["percent"])
+            eta = f"ETA {format_eta(event['eta_s'])}" if "eta_s" in event else ""
+            eta_var.set(f"{event['percent']:.0f}%  {eta}".strip())
+        elif kind == "stage":
+            progress_bar.stop()
+            progress_bar.config(mode="determinate", value=100 if event["status"] == "ok" else 0)
+        elif kind == INSERT_DISC:
+            if messagebox.askokcancel("Insert disc", f"Insert a blank disc for video {event['number']}/{event['total']}, then press OK."):
+                worker['disc_ready'].set()
+            else:
+                on_cancel()
+        elif kind == QUEUE_DONE:
+            selected_options['results'] = event["results"]
+
+    def drain(events, timeout=0.0):
+        try:
+            while True:
+                handle_event(events.get(timeout=timeout) if timeout else events.get_nowait())
+        except queue.Empty:
+            pass
+
+    def poll():
+        events = worker['events']
+        drain(events)
+        if worker['process'] is None:
+            # Cancelled from a dialog opened by handle_event
+            return
+        if worker['process'].is_alive():
+            root.after(100, poll)
+            return
+        # The worker may have posted its last events and exited after the drain above; they
+        # are flushed to the pipe before it exits, so wait briefly for each one
+        drain(events, timeout=0.5)
+        if worker['process'] is None:
+            return
+        worker['process'] = None
+        set_running(False)
+        results = selected_options['results']
+        if worker['cancelled']:
+            job_var.set("Cancelled.")
+            stage_var.set("")
+            return
+        failed = [r for r in results if r["error"]]
+        job_var.set(f"Finished {len(results) - len(failed)}/{len(video_list.get(0, tk.END))} videos.")
+        stage_var.set("")
+        lines = [f"{os.path.basename(r['file_path'])}: {r['error'] or 'done'}" for r in results]
+        if failed or len(results) < video_list.size():
+            messagebox.showerror("Finished with errors", "\n".join(lines) or "The worker exited unexpectedly.")
+        else:
+            messagebox.showinfo("Finished", "\n".join(lines))
+
+    def on_cancel():
+        if worker['process'] is None:
+            return
+        worker['cancelled'] = True
+        cancel_worker(worker['process'])
+        worker['process'] = None
+        set_running(False)
+        job_var.set("Cancelled.")
+        stage_var.set("")
+
+    def on_continue():
+        file_paths = list(video_list.get(0, tk.END))
+        if not file_paths:
+            messagebox.showwarning("No video selected", "Please add at least one input video.")
+            return
+        if not burn_var.get() and not iso_var.get():
+            messagebox.showwarning("No action selected", "No action selected")
+            return
+        if burn_var.get() and (not burn_drive_var.get() or burn_drive_var.get().startswith("No DVD drives found")):
+            messagebox.showwarning("No drive selected", "Please select a DVD drive.")
+            return
+        selected_options['burn'] = burn_var.get()
+        selected_options['iso'] = iso_var.get()
+        selected_options['burn_drive'] = burn_drive_var.get() if burn_var.get() else None
+        selected_options['output_dir'] = iso_dir_path.get() if iso_var.get() and iso_dir_path.get() else None
+        selected_options['results'] = []
+        set_running(True)
+        job_var.set(f"Starting {len(file_paths)} video(s)...")
+        worker['cancelled'] = False
+        worker['process'], worker['events'], worker['disc_ready'] = start_worker(file_paths, selected_options)
+        root.after(100, poll)
+
+    def on_close():
+        if worker['process'] is not None:
+            if not messagebox.askyesno("Quit", "A build is running. Cancel it and quit?"):
+                return
+            on_cancel()
+        root.quit()
 
     root = tk.Tk()
     root.title("Simplified DVD Creator")
-    root.geometry("850x300")
+    root.geometry("850x460")
     root.resizable(False, False)
     root.configure(bg="#f4f4f4")
+    root.protocol("WM_DELETE_WINDOW", on_close)
 
     # Style configuration
     style = ttk.Style(root)
@@ -93,20 +341,21 @@ def run_with_gui():
     title_label = ttk.Label(root, text="Simplified DVD Creator", font=("Segoe UI", 16, "bold"), background="#f4f4f4")
     title_label.grid(row=0, column=0, columnspan=3, pady=(10, 15))
 
-    # Video file selection (required, now row 1)
-    video_file_path = tk.StringVar()
-
-    video_label = ttk.Label(root, text="Input Video (.mp4):")
-    video_label.grid(row=1, column=0, padx=18, pady=(5, 5), sticky="w")
-    video_entry = ttk.Entry(root, textvariable=video_file_path, width=38, state="readonly")
-    video_entry.grid(row=1, column=1, padx=10, pady=(5, 5))
-    video_btn = ttk.Button(root, text="Browse", command=pick_video_file)
-    video_btn.grid(row=1, column=2, padx=10, pady=(5, 5))
+    # Video queue (required, built in order)
+    video_label = ttk.Label(root, text="Input Videos:")
+    video_label.grid(row=1, column=0, padx=18, pady=(5, 5), sticky="nw")
+    video_list = tk.Listbox(root, selectmode=tk.EXTENDED, height=5, width=52, font=('Segoe UI', 10))
+    video_list.grid(row=1, column=1, padx=10, pady=(5, 5), sticky="w")
+    video_btns = tk.Frame(root, bg="#f4f4f4")
+    video_btns.grid(row=1, column=2, padx=10, pady=(5, 5), sticky="n")
+    add_btn = ttk.Button(video_btns, text="Add...", command=add_videos)
+    add_btn.pack(fill="x", pady=(0, 5))
+    remove_btn = ttk.Button(video_btns, text="Remove", command=remove_videos)
+    remove_btn.pack(fill="x")
 
     burn_var = tk.BooleanVar()
     iso_var = tk.BooleanVar()
-    burn_file_path = tk.StringVar()
-    iso_file_path = tk.StringVar()
+    iso_dir_path = tk.StringVar()
 
     burn_cb = ttk.Checkbutton(root, text="Burn to DVD", variable=burn_var, command=on_burn_checked)
     burn_cb.grid(row=2, column=0, sticky="w", padx=18, pady=5)
@@ -118,109 +367,128 @@ def run_with_gui():
 
     iso_cb = ttk.Checkbutton(root, text="Create ISO", variable=iso_var, command=on_iso_checked)
     iso_cb.grid(row=3, column=0, sticky="w", padx=18, pady=5)
-    iso_file_btn = ttk.Button(root, text="Select ISO output", command=pick_iso_file, state=tk.DISABLED)
-    iso_file_btn.grid(row=3, column=1, padx=10, pady=5)
-    iso_file_entry = ttk.Entry(root, textvariable=iso_file_path, width=38, state="readonly")
-    iso_file_entry.grid(row=3, column=2, padx=10, pady=5)
+    iso_dir_btn = ttk.Button(root, text="Select ISO folder", command=pick_iso_dir, state=tk.DISABLED)
+    iso_dir_btn.grid(row=3, column=1, padx=10, pady=5)
+    iso_dir_entry = ttk.Entry(root, textvariable=iso_dir_path, width=38, state="readonly")
+    iso_dir_entry.grid(row=3, column=2, padx=10, pady=5)
+
+    # Progress of the running build
+    job_var = tk.StringVar(value="Idle.")
+    stage_var = tk.StringVar()
+    eta_var = tk.StringVar()
+    job_label = ttk.Label(root, textvariable=job_var)
+    job_label.grid(row=4, column=0, columnspan=3, padx=18, pady=(10, 0), sticky="w")
+    stage_label = ttk.Label(root, textvariable=stage_var)
+    stage_label.grid(row=5, column=0, padx=18, pady=5, sticky="w")
+    progress_bar = ttk.Progressbar(root, orient="horizontal", length=420, mode="determinate", maximum=100)
+    progress_bar.grid(row=5, column=1, padx=10, pady=5, sticky="w")
+    eta_label = ttk.Label(root, textvariable=eta_var)
+    eta_label.grid(row=5, column=2, padx=10, pady=5, sticky="w")
 
     # Add a quit button for convenience
-    quit_btn = ttk.Button(root, text="Quit", command=root.quit)
-    quit_btn.grid(row=4, column=1, sticky="e", padx=10, pady=18)
+    quit_btn = ttk.Button(root, text="Quit", command=on_close)
+    quit_btn.grid(row=6, column=0, sticky="w", padx=18, pady=18)
 
-    # Add a continue button
-    def on_continue():
-        # Disable continue button and show running status
-        continue_btn.config(state=tk.DISABLED)
-        continue_btn.config(text="Running...")
-        root.update_idletasks()
-        if not video_file_path.get():
-            messagebox.showwarning("No video selected", "Please select an input .mp4 video file.")
-            continue_btn.config(state=tk.NORMAL)
-            continue_btn.config(text="Continue")
-            return
-        if not burn_var.get() and not iso_var.get():
-            messagebox.showwarning("No action selected", "No action selected")
-            continue_btn.config(state=tk.NORMAL)
-            continue_btn.config(text="Continue")
-            return
-        selected_options['burn'] = burn_var.get()
-        selected_options['iso'] = iso_var.get()
-        selected_options['burn_drive'] = burn_drive_var.get() if burn_var.get() else None
-        selected_options['iso_output'] = iso_file_path.get() if iso_var.get() else None
-        selected_options['file_path'] = video_file_path.get()
-        dvd_xml_path = "dvd.xml"  # Always use the correct XML path
-        try:
-            if platform.system() == "Windows":
-                # Run all steps except isoburn, keep GUI open
-                burn_info = run_for_windows(
-                    burn=selected_options['burn'],
-                    iso=dvd_xml_path,
-                    burn_drive=selected_options['burn_drive'],
-                    iso_output=selected_options['iso_output'],
-                    file_path=selected_options['file_path'],
-                    skip_burn=True
-                )
-                # Save for after GUI closes
-                selected_options['__burn_info'] = burn_info
-            elif platform.system() == "Linux":
-                run_for_linux(
-                    burn=selected_options['burn'],
-                    iso=dvd_xml_path,
-                    burn_drive=selected_options['burn_drive'],
-                    iso_output=selected_options['iso_output'],
-                    file_path=selected_options['file_path']
-                )
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
-        root.quit()
+    cancel_btn = ttk.Button(root, text="Cancel", command=on_cancel, state=tk.DISABLED)
+    cancel_btn.grid(row=6, column=1, sticky="e", padx=10, pady=18)
 
     continue_btn = ttk.Button(root, text="Continue", command=on_continue)
-    continue_btn.grid(row=4, column=2, sticky="e", padx=10, pady=18)
+    continue_btn.grid(row=6, column=2, sticky="e", padx=10, pady=18)
 
     # Add some spacing
     root.grid_rowconfigure(0, minsize=10)
-    root.grid_rowconfigure(4, minsize=20)
+    root.grid_rowconfigure(6, minsize=20)
     root.grid_columnconfigure(0, minsize=140)
     root.grid_columnconfigure(1, minsize=160)
     root.grid_columnconfigure(2, minsize=320)
 
-    # Populate DVD drives (Linux example: /dev/sr*, /dev/cdrom, /dev/dvd)
-    if platform.system() == "Windows":
-        drives = get_optical_drives()
+    # Populate DVD drives (cached, see drives.py)
+    if platform.system() in ("Windows", "Linux"):
+        drives = list_optical_drives()
         burn_drive_combo['values'] = [d['drive'] for d in drives] if drives else ["No DVD drives found"]
-    elif platform.system() == "Linux":
-        drives = glob.glob("/dev/sr*") + glob.glob("/dev/cdrom*") + glob.glob("/dev/dvd*")
-        if not drives:
-            drives = ["No DVD drives found"]
-        burn_drive_combo['values'] = drives
     else:
         drives = ["No DVD drives found, invalid platform"]
-        
-    # Add a note for Windows users about the burn process
-    if platform.system() == "Windows":
-        note_label = ttk.Label(
-            root,
-            text="Note: On Windows, the window may show as 'Not Responding' while burning the disc, and will not close until the isoburn window is closed.",
-            font=("Segoe UI", 10, "italic"),
-            background="#f4f4f4",
-            foreground="#a06000",
-            wraplength=700,
-            justify="left"
-        )
-        note_label.grid(row=5, column=0, columnspan=3, padx=18, pady=(0, 10), sticky="w")
 
     root.mainloop()
-
-    # After GUI closes, if on Windows and burn is requested, run isoburn step
-    if platform.system() == "Windows" and selected_options.get('burn') and selected_options.get('__burn_info'):
-        burn_info = selected_options['__burn_info']
-        run_isoburn_step(burn_info['iso_output'], burn_info['burn_drive'])
+    root.destroy()
 
     return selected_options
 
-def run_with_cli(burn: bool, iso: bool, preview: bool, file_path: str, iso_output: Optional[str]):
+def run_with_cli(burn: bool, iso: bool, preview: bool, file_path: Optional[str], iso_output: Optional[str], burn_drive: Optional[str] = None, use_cache: bool = True, segmented: bool = False, streaming: bool = False, native_iso: bool = False, passthrough: bool = True, resume: bool = False, duplicate_drives: Optional[List[str]] = None, verify: bool = True, audio_tracks: Optional[List[str]] = None, preview_output: Optional[str] = None, chapter_interval: Optional[float] = None, scratch_dir: Optional[str] = None):
     """Run the application in CLI mode with the provided options."""
-    pass
+    if file_path is None:
+        # GUI mode already ran the pipeline
+        return
+    from scratch import scratch_path
+    workdir = scratch_path("dvd_workdir", scratch_dir)
+    if preview:
+        from preview import run_preview
+        run_preview(file_path, output_path=preview_output)
+        if not burn and not iso and not duplicate_drives:
+            return
+    if duplicate_drives:
+        if platform.system() != "Linux":
+            logger.error("Duplication mode is only supported on Linux.")
+            return
+        from duplicate import duplicate_iso
+        from encoder import DEFAULT_CHAPTER_INTERVAL
+        from linux import run_for_linux
+        # Master the ISO once, then burn it to every drive in parallel
+        iso_path = run_for_linux(
+            burn=False,
+            iso="dvd.xml",
+            burn_drive=None,
+            iso_output=iso_output,
+            file_path=file_path,
+            workdir=workdir,
+            use_cache=use_cache,
+            segmented=segmented,
+            native_iso=native_iso,
+            passthrough=passthrough,
+            resume=resume,
+            audio_tracks=audio_tracks,
+            chapter_interval=DEFAULT_CHAPTER_INTERVAL if chapter_interval is None else chapter_interval
+        )
+        if iso_path:
+            duplicate_iso(iso_path, duplicate_drives, verify=verify)
+        return
+    if not burn and not iso:
+        logger.warning("No action selected, pass --iso and/or --burn.")
+        return
+    if burn and not burn_drive:
+        logger.warning("--burn requested without --burn-drive, burning will be skipped.")
+    if platform.system() == "Windows":
+        from windows import run_for_windows
+        run_for_windows(
+            burn=burn,
+            iso="dvd.xml",
+            burn_drive=burn_drive,
+            iso_output=iso_output,
+            file_path=file_path,
+            workdir=workdir
+        )
+    elif platform.system() == "Linux":
+        from encoder import DEFAULT_CHAPTER_INTERVAL
+        from linux import run_for_linux
+        run_for_linux(
+            burn=burn,
+            iso="dvd.xml",
+            burn_drive=burn_drive,
+            iso_output=iso_output,
+            file_path=file_path,
+            workdir=workdir,
+            use_cache=use_cache,
+            segmented=segmented,
+            streaming=streaming,
+            make_iso=iso,
+            native_iso=native_iso,
+            passthrough=passthrough,
+            resume=resume,
+            audio_tracks=audio_tracks,
+            chapter_interval=DEFAULT_CHAPTER_INTERVAL if chapter_interval is None else chapter_interval
+        )
+    else:
+        logger.error(f"Unsupported platform: {platform.system()}")
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import time
+
+from loguru import logger
+
+from cache import sha256_file
+
+MANIFEST_NAME = "manifest.json"
+
+
+def stat_fingerprint(path):
+    """Cheap identity of an input file: absolute path, size and modification time."""
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _files_below(path):
+    if os.path.isfile(path):
+        return [(os.path.basename(path), path)]
+    files = []
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            full = os.path.join(dirpath, name)
+            files.append((os.path.relpath(full, path), full))
+    return sorted(files)
+
+
+class StageManifest:
+    """
+    Record of the completed stages of one job, kept as manifest.json in its workdir.
+    Each stage stores a fingerprint of its inputs and the size and mtime of every output file
+    (plus its SHA-256 when recorded with checksum=True), so a resumed build can skip stages
+    whose outputs are still valid.
+    """
+
+    def __init__(self, workdir):
+        self.path = os.path.join(workdir, MANIFEST_NAME)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.stages = json.load(f)
+        except (OSError, ValueError):
+            self.stages = {}
+
+    @staticmethod
+    def fingerprint(**inputs):
+        """Stable hash of a stage's inputs (any JSON-serialisable values)."""
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def digest(self, stage):
+        """Hash of a completed stage's output checksums, for use as a downstream input, or None."""
+        entry = self.stages.get(stage)
+        if not entry:
+            return None
+        return self.fingerprint(outputs=entry["outputs"])
+
+    def is_valid(self, stage, inputs, verify=False):
+        """
+        True if stage completed with the same inputs and all of its outputs are unchanged.
+        Outputs are compared by size and mtime; verify=True also re-checks the SHA-256 of outputs
+        recorded with checksum=True.
+        """
+        entry = self.stages.get(stage)
+        if not entry or entry["inputs"] != inputs:
+            return False
+        for path, files in entry["outputs"].items():
+            if not os.path.exists(path):
+                return False
+            current = dict(_files_below(path))
+            if set(current) != set(files):
+                return False
+            for rel, recorded in files.items():
+                st = os.stat(current[rel])
+                if st.st_size != recorded["size"] or st.st_mtime_ns != recorded["mtime_ns"]:
+                    return False
+                if verify and "sha256" in recorded and sha256_file(current[rel]) != recorded["sha256"]:
+                    return False
+        return True
+
+    def record(self, stage, inputs, outputs, checksum=False):
+        """
+        Mark stage as completed with the given input fingerprint and output paths.
+        checksum: Also store the SHA-256 of every output for is_valid(verify=True); this reads
+            all of them again, so it is off by default
+        """
+        if checksum:
+            logger.info(f"Checksumming outputs of stage {stage}...")
+        recorded = {}
+        for path in outputs:
+            path = os.path.abspath(path)
+            recorded[path] = {}
+            for rel, full in _files_below(path):
+                st = os.stat(full)
+                recorded[path][rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                if checksum:
+                    recorded[path][rel]["sha256"] = sha256_file(full)
+        self.stages[stage] = {"inputs": inputs, "outputs": recorded, "completed": time.time()}
+        self._save()
+
+    def invalidate(self, stage):
+        if self.stages.pop(stage, None) is not None:
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.stages, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,167 @@
+import json
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+
+from loguru import logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# How often live ffmpeg progress is echoed to the log (every update still goes to the metrics file)
+PROGRESS_LOG_INTERVAL = 5.0
+
+
+def _children_cpu_seconds():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def path_size(path):
+    """Size in bytes of a file, or of all files below a directory."""
+    if not path or not os.path.exists(path):
+        return 0
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+class PipelineMetrics:
+    """
+    Collects per-stage timings and live progress for one job and writes them as JSON lines.
+    metrics_path: File to append JSON lines to (None to only keep them in memory)
+    job: Job label included in every record (e.g. the input file name)
+    listener: Optional callable that also receives every record as it is emitted (e.g. a GUI's progress queue)
+    """
+
+    def __init__(self, metrics_path=None, job=None, listener=None):
+        self.metrics_path = metrics_path
+        self.job = job
+        self.listener = listener
+        self.stages = {}
+        if metrics_path:
+            os.makedirs(os.path.dirname(os.path.abspath(metrics_path)), exist_ok=True)
+
+    def emit(self, event, **fields):
+        record = {"ts": round(time.time(), 3), "event": event, "job": self.job}
+        record.update(fields)
+        if self.metrics_path:
+            with open(self.metrics_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        if self.listener:
+            self.listener(record)
+        return record
+
+    @contextmanager
+    def stage(self, name, output_path=None):
+        """
+        Time a pipeline stage. Wall time, CPU time of this process and its child processes,
+        and the bytes found at output_path afterwards are recorded when the block exits.
+        Yields a dict; set its "status" to "failed" for failures that do not raise.
+        Any other keys added to the dict are included in the stage record.
+        """
+        self.emit("stage_start", stage=name)
+        wall_start = time.monotonic()
+        cpu_start = time.process_time() + _children_cpu_seconds()
+        info = {"status": "ok"}
+        try:
+            yield info
+        except BaseException:
+            info["status"] = "failed"
+            raise
+        finally:
+            wall = time.monotonic() - wall_start
+            cpu = time.process_time() + _children_cpu_seconds() - cpu_start
+            size = path_size(output_path)
+            status = info["status"]
+            record = self.emit(
+                "stage",
+                stage=name,
+                status=status,
+                wall_s=round(wall, 3),
+                cpu_s=round(cpu, 3),
+                bytes=size,
+                mb_per_s=round(size / 1e6 / wall, 3) if wall > 0 else None,
+                **{k: v for k, v in info.items() if k != "status"},
+            )
+            self.stages[name] = record
+            logger.info(
+                f"Stage {name} {status}: {wall:.1f}s wall, {cpu:.1f}s CPU"
+                + (f", {size / 1e6:.1f} MB at {record['mb_per_s']:.1f} MB/s" if size else "")
+            )
+
+    def progress(self, stage, **fields):
+        self.emit("progress", stage=stage, **fields)
+
+    def summary(self):
+        total = sum(r["wall_s"] for r in self.stages.values())
+        return self.emit("summary", total_wall_s=round(total, 3), stages={k: v["wall_s"] for k, v in self.stages.items()})
+
+
+def parse_progress_block(lines):
+    """Turn one block of ffmpeg '-progress' key=value lines into a progress record."""
+    raw = dict(line.split("=", 1) for line in lines if "=" in line)
+    record = {}
+    for key in ("frame", "total_size", "out_time_us", "drop_frames", "dup_frames"):
+        value = raw.get(key, "N/A").strip()
+        if value.lstrip("-").isdigit():
+            record[key] = int(value)
+    for key in ("fps", "bitrate", "speed"):
+        value = raw.get(key, "N/A").strip().rstrip("x").replace("kbits/s", "")
+        try:
+            record[key] = float(value)
+        except ValueError:
+            pass
+    record["done"] = raw.get("progress", "").strip() == "end"
+    return record
+
+
+def run_ffmpeg_with_progress(cmd, metrics, stage="encode", duration=None, on_progress=None):
+    """
+    Run an ffmpeg command with machine-readable progress on stdout and record every update.
+    cmd: ffmpeg argument list (must not write its own output to stdout)
+    metrics: PipelineMetrics receiving the progress records
+    duration: Input duration in seconds, used for percent complete and ETA
+    on_progress: Optional callback called with each progress record
+
+    Returns the ffmpeg exit code.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + cmd[1:]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    block = []
+    last_log = 0.0
+    for line in process.stdout:
+        block.append(line)
+        if not line.startswith("progress="):
+            continue
+        record = parse_progress_block(block)
+        block = []
+        if duration and "out_time_us" in record:
+            done_s = record["out_time_us"] / 1e6
+            record["percent"] = round(min(100.0, done_s * 100.0 / duration), 1)
+            if record.get("speed"):
+                record["eta_s"] = round(max(0.0, duration - done_s) / record["speed"], 1)
+        metrics.progress(stage, **record)
+        if on_progress:
+            on_progress(record)
+        now = time.monotonic()
+        if now - last_log >= PROGRESS_LOG_INTERVAL or record["done"]:
+            last_log = now
+            logger.info(
+                f"ffmpeg: frame={record.get('frame', '?')} fps={record.get('fps', '?')} "
+                f"speed={record.get('speed', '?')}x size={record.get('total_size', 0) / 1e6:.1f} MB"
+                + (f" ({record['percent']}%)" if "percent" in record else "")
+            )
+    return process.wait()
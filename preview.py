@@ -0,0 +1,105 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from loguru import logger
+
+from encoder import dvd_encode_args
+from probe import get_duration, get_streams, get_video_packets
+
+PREVIEW_SEGMENT_SECONDS = 5.0
+# Besides the start and the middle, this many of the busiest sections are sampled
+MOTION_SEGMENTS = 2
+# First match wins; each entry is the command prefix used to open the preview
+PREVIEW_PLAYERS = (["vlc", "--play-and-exit"], ["mpv"], ["ffplay", "-autoexit"])
+
+
+def find_motion_segments(packets, duration, count=MOTION_SEGMENTS, seconds=PREVIEW_SEGMENT_SECONDS, exclude=()):
+    """
+    Start times of the count windows with the most inter-frame (non-keyframe) bytes, a cheap
+    stand-in for motion that needs no decoding. Windows overlapping exclude starts are skipped.
+    """
+    window_bytes = {}
+    for pts_time, size, keyframe in packets:
+        if not keyframe and 0 <= pts_time < duration:
+            window = int(pts_time // seconds)
+            window_bytes[window] = window_bytes.get(window, 0) + size
+    starts = []
+    taken = list(exclude)
+    for window in sorted(window_bytes, key=window_bytes.get, reverse=True):
+        if len(starts) >= count:
+            break
+        start = window * seconds
+        if any(abs(start - other) < seconds for other in taken):
+            continue
+        starts.append(start)
+        taken.append(start)
+    return starts
+
+
+def pick_preview_segments(duration, file_path, seconds=PREVIEW_SEGMENT_SECONDS):
+    """
+    Sorted start times of the preview segments: the start, the middle and the busiest sections.
+    Returns (starts, segment length); short inputs are previewed whole.
+    """
+    if duration <= seconds * 3:
+        return [0.0], duration
+    starts = [0.0, round(duration / 2 - seconds / 2, 3)]
+    try:
+        starts += find_motion_segments(get_video_packets(file_path), duration - seconds, seconds=seconds, exclude=starts)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        logger.warning("Could not read the video packets, previewing the start and middle only.")
+    return sorted(starts), seconds
+
+
+def preview_command(file_path, starts, seconds, output_mpg, has_audio=True):
+    """
+    One ffmpeg process that fast-seeks to every segment, joins them and encodes the result with the
+    exact DVD settings of a real build (including any autotuned profile).
+    """
+    cmd = ["ffmpeg", "-y", "-v", "error"]
+    for start in starts:
+        cmd += ["-ss", f"{start:.3f}", "-t", f"{seconds:.3f}", "-i", file_path]
+    streams = "".join(f"[{i}:v:0]" + (f"[{i}:a:0]" if has_audio else "") for i in range(len(starts)))
+    graph = f"{streams}concat=n={len(starts)}:v=1:a={1 if has_audio else 0}[v]" + ("[a]" if has_audio else "")
+    cmd += ["-filter_complex", graph, "-map", "[v]"] + (["-map", "[a]"] if has_audio else [])
+    return cmd + dvd_encode_args() + [output_mpg]
+
+
+def find_player():
+    for player in PREVIEW_PLAYERS:
+        if shutil.which(player[0]):
+            return player
+    return None
+
+
+def run_preview(file_path, output_path=None, seconds=PREVIEW_SEGMENT_SECONDS):
+    """
+    Encode a short proxy of file_path from a few sampled segments.
+    file_path: Path to input video file
+    output_path: Where to write the preview; when None it goes to a temp file and opens in
+        VLC, mpv or ffplay (or stays on disk if none is installed)
+    seconds: Length of each sampled segment
+
+    Returns the preview path, or None if ffmpeg failed.
+    """
+    duration = get_duration(file_path)
+    starts, seconds = pick_preview_segments(duration, file_path, seconds)
+    has_audio = any(s.get("codec_type") == "audio" for s in get_streams(file_path))
+    player = None if output_path else find_player()
+    if not output_path:
+        output_path = os.path.join(tempfile.gettempdir(), "simplified-dvd-preview.mpg")
+    logger.info(
+        f"Encoding a {len(starts) * seconds:.0f}s preview of {duration / 60:.1f} min from "
+        + ", ".join(f"{start / 60:.1f} min" for start in starts) + "..."
+    )
+    if subprocess.run(preview_command(file_path, starts, seconds, output_path, has_audio)).returncode != 0:
+        logger.error("ffmpeg failed to encode the preview!")
+        return None
+    if player:
+        logger.info(f"Opening the preview with {player[0]}...")
+        subprocess.Popen(player + [output_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        logger.info(f"Preview written to {output_path}")
+    return output_path
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+from contextlib import contextmanager
+
+from loguru import logger
+
+PROBE_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "simplified-dvd", "probe_index.sqlite3")
+# Bytes read from the start, middle and end of a file for its quick content hash
+QUICK_HASH_CHUNK = 1024 * 1024
+
+# Kinds of probe results kept in the index
+PROBE_INFO = "info"
+PROBE_PACKETS = "packets"
+
+
+def run_ffprobe(args):
+    """Run ffprobe with JSON output and return the parsed result."""
+    cmd = ["ffprobe", "-v", "error", "-of", "json"] + args
+    result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout or "{}")
+
+
+def quick_hash(file_path):
+    """
+    Content hash from the size and three 1 MB samples (start, middle, end), so a multi-GB input
+    is recognised after a rename or touch without reading all of it.
+    """
+    size = os.path.getsize(file_path)
+    h = hashlib.sha256(str(size).encode("ascii"))
+    with open(file_path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - QUICK_HASH_CHUNK // 2), max(0, size - QUICK_HASH_CHUNK)}):
+            f.seek(offset)
+            h.update(f.read(QUICK_HASH_CHUNK))
+    return h.hexdigest()
+
+
+class ProbeIndex:
+    """
+    On-disk index of ffprobe results, shared by every stage and every run.
+    A file is looked up by path, size and mtime first, and by its quick content hash otherwise.
+    Each kind of result is probed lazily the first time a stage asks for it.
+    """
+
+    def __init__(self, db_path=PROBE_INDEX_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, quick_hash TEXT)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS probes (quick_hash TEXT, kind TEXT, data TEXT, PRIMARY KEY (quick_hash, kind))"
+            )
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per call, so threads and pool workers can share the index
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def content_key(self, file_path):
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+        with self._connect() as db:
+            row = db.execute("SELECT size, mtime_ns, quick_hash FROM files WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                return row[2]
+            key = quick_hash(path)
+            db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, quick_hash) VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, key),
+            )
+            return key
+
+    def get(self, file_path, kind, compute):
+        """The stored result of kind for file_path, computed with compute(file_path) if missing."""
+        key = self.content_key(file_path)
+        with self._connect() as db:
+            row = db.execute("SELECT data FROM probes WHERE quick_hash = ? AND kind = ?", (key, kind)).fetchone()
+        if row:
+            return json.loads(row[0])
+        value = compute(file_path)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO probes (quick_hash, kind, data) VALUES (?, ?, ?)",
+                (key, kind, json.dumps(value, separators=(",", ":"))),
+            )
+        return value
+
+
+_probe_index = None
+
+
+def cached_probe(file_path, kind, compute):
+    """Run compute(file_path) through the shared probe index, or directly if the index is unusable."""
+    global _probe_index
+    try:
+        if _probe_index is None:
+            _probe_index = ProbeIndex()
+        return _probe_index.get(file_path, kind, compute)
+    except sqlite3.Error as e:
+        logger.warning(f"Probe index unavailable ({e}), probing {file_path} directly.")
+        return compute(file_path)
+
+
+def _probe_info(file_path):
+    return run_ffprobe(["-show_format", "-show_streams", file_path])
+
+
+def _probe_packets(file_path):
+    info = run_ffprobe(["-select_streams", "v:0", "-show_entries", "packet=pts_time,size,flags", file_path])
+    packets = []
+    for packet in info.get("packets", []):
+        pts_time = packet.get("pts_time")
+        if pts_time in (None, "N/A"):
+            continue
+        packets.append([float(pts_time), int(packet.get("size", 0)), "K" in packet.get("flags", "")])
+    return packets
+
+
+def get_media_info(file_path):
+    """Return ffprobe's format and stream information for file_path."""
+    return cached_probe(file_path, PROBE_INFO, _probe_info)
+
+
+def get_duration(file_path):
+    """Return the container duration of file_path in seconds."""
+    return float(get_media_info(file_path).get("format", {}).get("duration") or 0.0)
+
+
+def get_start_time(file_path):
+    """Return the container start time of file_path in seconds (nonzero for e.g. MPEG-TS recordings)."""
+    try:
+        return float(get_media_info(file_path).get("format", {}).get("start_time") or 0.0)
+    except ValueError:
+        return 0.0
+
+
+def get_streams(file_path):
+    """Return ffprobe's stream list (codec, dimensions, frame rate, sample rate, ...) for file_path."""
+    return get_media_info(file_path).get("streams", [])
+
+
+def get_keyframes(file_path):
+    """
+    Return the sorted timestamps (seconds from the start of the file, as ffmpeg -ss counts them) of
+    the keyframes of the first video stream. Only packet headers are read, nothing is decoded.
+    """
+    return sorted({pts_time for pts_time, _, keyframe in get_video_packets(file_path) if keyframe})
+
+
+def get_video_packets(file_path):
+    """
+    Return (pts_time, size in bytes, is_keyframe) for every packet of the first video stream.
+    pts_time is relative to the container start time, like get_keyframes, and only packet headers are read.
+    """
+    start = get_start_time(file_path)
+    return [(pts_time - start, size, keyframe) for pts_time, size, keyframe in cached_probe(file_path, PROBE_PACKETS, _probe_packets)]
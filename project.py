@@ -0,0 +1,183 @@
+"""
+Multi-title projects that are rebuilt incrementally.
+
+A project directory keeps the encoded program stream of every title (the VOB sources dvdauthor
+reads) under sources/, named by a hash of the full input content and the encoder settings. Its
+manifest.json records each source like a resumable stage (see manifest.py), plus the authoring and
+mastering stages. On a rebuild only titles whose fingerprint is new are encoded. Unchanged,
+reordered or re-added titles reuse their sources. Only the cheap dvdauthor and ISO steps run again,
+and only when the title list changed. Sources of removed titles are deleted once the new disc is built.
+
+    python main.py --manifest titles.txt --project weekly/ --iso-output weekly.iso
+"""
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from cache import TranscodeCache
+from discpack import DISC_RESERVE_BYTES, DISC_SIZES, MAX_TITLES_PER_DISC, encode_title, title_bytes
+from encoder import DEFAULT_CHAPTER_INTERVAL, dvd_encode_args, plan_chapters
+from isowriter import find_iso_tool, write_dvd_iso
+from linux import create_dvd_xml, dvdauthor_command, iso_command
+from manifest import StageManifest
+from metrics import PipelineMetrics
+from probe import get_duration, get_keyframes
+
+SOURCES_DIR = "sources"
+# Manifest stages holding one title's encoded source each
+SOURCE_STAGE_PREFIX = "source:"
+
+
+def title_key(file_path):
+    """
+    Fingerprint of a title's encoded source: the full SHA-256 of the input and the encoder settings.
+    The digest is remembered per path, size and mtime (see cache.py), so unchanged clips are not re-read.
+    """
+    return TranscodeCache().key(file_path, dvd_encode_args())[:32]
+
+
+def source_path(project_dir, key):
+    return os.path.join(project_dir, SOURCES_DIR, f"{key}.mpg")
+
+
+def plan_project(file_paths, project_dir, manifest):
+    """
+    Match the titles against the sources kept in the project.
+    Returns a list of {"file_path", "key", "source", "reuse"} in title order.
+    """
+    titles = []
+    for file_path in file_paths:
+        key = title_key(file_path)
+        titles.append({
+            "file_path": os.path.abspath(file_path),
+            "key": key,
+            "source": source_path(project_dir, key),
+            "reuse": manifest.is_valid(SOURCE_STAGE_PREFIX + key, key),
+        })
+    return titles
+
+
+def remove_unused_sources(project_dir, manifest, keys):
+    """Delete the sources (and their manifest stages) of titles that are no longer in the project."""
+    for stage in [s for s in manifest.stages if s.startswith(SOURCE_STAGE_PREFIX)]:
+        key = stage[len(SOURCE_STAGE_PREFIX):]
+        if key not in keys:
+            manifest.invalidate(stage)
+    for name in os.listdir(os.path.join(project_dir, SOURCES_DIR)):
+        if os.path.splitext(name)[0] not in keys:
+            logger.info(f"Removing unused source {name}")
+            os.remove(os.path.join(project_dir, SOURCES_DIR, name))
+
+
+def run_project(file_paths, project_dir, iso_output=None, disc_size="dvd5", use_cache=True, jobs=2, native_iso=False, chapter_interval=DEFAULT_CHAPTER_INTERVAL):
+    """
+    Build one multi-title disc from file_paths, reusing everything the project already has.
+    file_paths: Title inputs in playback order
+    project_dir: Directory keeping the sources, the manifest and the authored DVD folder
+    iso_output: ISO to write (default: dvd.iso in project_dir)
+    disc_size: Key of DISC_SIZES the titles must fit on
+    use_cache: Also look new titles up in the transcode cache (see cache.py)
+    jobs: Number of titles encoded at once
+    chapter_interval: Seconds between automatic chapter marks, 0 for none
+
+    Returns the ISO path, or None on failure.
+    """
+    if not file_paths:
+        logger.warning("The project has no titles.")
+        return None
+    if len(file_paths) > MAX_TITLES_PER_DISC:
+        logger.error(f"A disc holds at most {MAX_TITLES_PER_DISC} titles, the project has {len(file_paths)}.")
+        return None
+    os.environ["VIDEO_FORMAT"] = "NTSC"
+    project_dir = os.path.abspath(project_dir)
+    os.makedirs(os.path.join(project_dir, SOURCES_DIR), exist_ok=True)
+    iso_output = os.path.abspath(iso_output or os.path.join(project_dir, "dvd.iso"))
+    os.makedirs(os.path.dirname(iso_output), exist_ok=True)
+    manifest = StageManifest(project_dir)
+    metrics = PipelineMetrics(os.path.join(project_dir, "metrics.jsonl"), job=os.path.basename(project_dir))
+
+    durations = [get_duration(path) for path in file_paths]
+    usable = DISC_SIZES[disc_size] - DISC_RESERVE_BYTES
+    expected = sum(title_bytes(d, None) for d in durations)
+    if expected > usable:
+        logger.error(f"The titles need about {expected / 1e9:.2f} GB, more than a {disc_size} disc holds.")
+        return None
+
+    titles = plan_project(file_paths, project_dir, manifest)
+    # The same clip listed twice is encoded once
+    pending = {t["key"]: (t, d) for t, d in zip(titles, durations) if not t["reuse"]}
+    reused = sum(1 for t in titles if t["reuse"])
+    logger.info(f"Project {project_dir}: {len(titles)} titles, {reused} reused, {len(pending)} to encode.")
+    manifest_lock = threading.Lock()
+
+    def encode(key):
+        title, duration = pending[key]
+        tmp_path = os.path.splitext(title["source"])[0] + ".partial.mpg"
+        # Left behind by an interrupted run; ffmpeg would stop to ask about overwriting it
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        logger.info(f"Encoding {os.path.basename(title['file_path'])}...")
+        if not encode_title(title["file_path"], tmp_path, None, duration, metrics, f"encode_{key[:8]}", use_cache):
+            return False
+        os.replace(tmp_path, title["source"])
+        with manifest_lock:
+            manifest.record(SOURCE_STAGE_PREFIX + key, key, [title["source"]])
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        if not all(executor.map(encode, list(pending))):
+            return None
+
+    # Author and master again only if the title list, order or chapters changed
+    chapters = [
+        plan_chapters(get_keyframes(t["file_path"]), d, interval=chapter_interval) if chapter_interval else None
+        for t, d in zip(titles, durations)
+    ]
+    author_inputs = StageManifest.fingerprint(
+        sources=[manifest.digest(SOURCE_STAGE_PREFIX + t["key"]) for t in titles], chapters=chapters
+    )
+    dvd_folder = os.path.join(project_dir, "DVD")
+    if manifest.is_valid("author", author_inputs):
+        logger.info("The title list is unchanged, skipping dvdauthor.")
+    else:
+        manifest.invalidate("author")
+        create_dvd_xml(
+            os.path.join(project_dir, "dvd.xml"),
+            titles=[os.path.join(SOURCES_DIR, os.path.basename(t["source"])) for t in titles],
+            chapters=chapters,
+        )
+        if os.path.exists(dvd_folder):
+            shutil.rmtree(dvd_folder)
+        os.makedirs(dvd_folder)
+        try:
+            with metrics.stage("author", output_path=dvd_folder):
+                subprocess.run(dvdauthor_command(), check=True, cwd=project_dir)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"dvdauthor failed: {e}")
+            return None
+        manifest.record("author", author_inputs, [dvd_folder])
+
+    iso_tool = None if native_iso else find_iso_tool()
+    master_inputs = StageManifest.fingerprint(author=manifest.digest("author"), output=iso_output, tool=iso_tool)
+    if manifest.is_valid("master", master_inputs):
+        logger.info(f"{iso_output} is up to date.")
+    else:
+        manifest.invalidate("master")
+        try:
+            with metrics.stage("master", output_path=iso_output):
+                if iso_tool:
+                    subprocess.run(iso_command(iso_tool, iso_output), check=True, cwd=project_dir)
+                else:
+                    write_dvd_iso(dvd_folder, iso_output)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Mastering {iso_output} failed: {e}")
+            return None
+        manifest.record("master", master_inputs, [iso_output])
+
+    remove_unused_sources(project_dir, manifest, {t["key"] for t in titles})
+    metrics.summary()
+    return iso_output
@@ -0,0 +1,196 @@
+"""
+Pipelined job scheduler for Linux batch builds.
+
+Every job is a small DAG of stages (encode -> author -> master -> burn). Each stage needs
+a slot from its resource class: CPU encode slots, disk I/O slots, or one specific burner.
+Stages from different jobs interleave freely, so one job's genisoimage runs while the next
+job is encoding instead of the whole batch waiting on each blocking step in turn.
+"""
+import asyncio
+import os
+import shutil
+import time
+from functools import partial
+
+from loguru import logger
+
+from batch import BATCH_WORKROOT, plan_jobs, print_batch_summary
+from cache import TranscodeCache
+from encoder import dvd_encode_args, ffmpeg_dvd_command
+from isowriter import find_iso_tool, write_dvd_iso
+from linux import create_dvd_xml, dvdauthor_command, growisofs_command, iso_command
+
+RESOURCE_CPU = "cpu"
+RESOURCE_DISK = "disk"
+RESOURCE_BURNER = "burner"
+
+
+class Stage:
+    """
+    One step of a job.
+    name: Stage name used in logs and results
+    resource: RESOURCE_CPU, RESOURCE_DISK or RESOURCE_BURNER
+    action: Coroutine function called with the job dict (and the drive for burner stages)
+    after: Names of the stages of the same job that must finish first
+    """
+
+    def __init__(self, name, resource, action, after=()):
+        self.name = name
+        self.resource = resource
+        self.action = action
+        self.after = tuple(after)
+
+
+class Resources:
+    """Concurrency limits shared by all jobs."""
+
+    def __init__(self, cpu_slots, disk_slots, burn_drives):
+        self.cpu = asyncio.Semaphore(cpu_slots)
+        self.disk = asyncio.Semaphore(disk_slots)
+        # A queue of idle drives, so a burn takes whichever burner frees up first
+        self.burners = asyncio.Queue()
+        for drive in burn_drives:
+            self.burners.put_nowait(drive)
+
+
+async def run_command(cmd, cwd=None):
+    """Run cmd without blocking the event loop. Raises RuntimeError on a non-zero exit."""
+    # Concurrent jobs must not share the terminal's stdin
+    process = await asyncio.create_subprocess_exec(*cmd, cwd=cwd, stdin=asyncio.subprocess.DEVNULL)
+    returncode = await process.wait()
+    if returncode != 0:
+        raise RuntimeError(f"{cmd[0]} exited with code {returncode}")
+
+
+async def run_blocking(func, *args):
+    """Run a blocking Python function (hashing, native ISO writing) on the default executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args))
+
+
+async def encode_stage(job):
+    workdir = job["workdir"]
+    output_mpg = os.path.join(workdir, "output.mpg")
+    cache = TranscodeCache() if job["use_cache"] else None
+    if cache:
+        cache_key = await run_blocking(cache.key, job["file_path"], dvd_encode_args())
+        if await run_blocking(cache.fetch, cache_key, output_mpg):
+            logger.info(f"[{job['index']}] Transcode cache hit, skipping ffmpeg.")
+            return
+    await run_command(ffmpeg_dvd_command(job["file_path"], output_mpg))
+    if cache:
+        await run_blocking(cache.store, cache_key, output_mpg)
+
+
+async def author_stage(job):
+    workdir = job["workdir"]
+    create_dvd_xml(os.path.join(workdir, "dvd.xml"), video_filename="output.mpg")
+    os.makedirs(os.path.join(workdir, "DVD"), exist_ok=True)
+    await run_command(dvdauthor_command(), cwd=workdir)
+    # The MPEG-2 program stream is now inside the VOBs, free the scratch space early
+    os.remove(os.path.join(workdir, "output.mpg"))
+
+
+async def master_stage(job):
+    iso_tool = find_iso_tool()
+    if iso_tool:
+        await run_command(iso_command(iso_tool, job["iso_output"]), cwd=job["workdir"])
+    else:
+        await run_blocking(write_dvd_iso, os.path.join(job["workdir"], "DVD"), job["iso_output"])
+
+
+async def burn_stage(job, drive):
+    logger.info(f"[{job['index']}] Burning {job['iso_output']} to {drive}...")
+    await run_command(growisofs_command(drive, iso_path=job["iso_output"]))
+
+
+def job_stages(burn):
+    """The stage DAG of a single job."""
+    stages = [
+        Stage("encode", RESOURCE_CPU, encode_stage),
+        Stage("author", RESOURCE_DISK, author_stage, after=["encode"]),
+        Stage("master", RESOURCE_DISK, master_stage, after=["author"]),
+    ]
+    if burn:
+        stages.append(Stage("burn", RESOURCE_BURNER, burn_stage, after=["master"]))
+    return stages
+
+
+async def run_stage(job, stage, deps, resources, timings):
+    await asyncio.gather(*deps)
+    if stage.resource == RESOURCE_BURNER:
+        drive = await resources.burners.get()
+        try:
+            start = time.monotonic()
+            await stage.action(job, drive)
+        finally:
+            resources.burners.put_nowait(drive)
+    else:
+        semaphore = resources.cpu if stage.resource == RESOURCE_CPU else resources.disk
+        async with semaphore:
+            start = time.monotonic()
+            logger.info(f"[{job['index']}] {stage.name} started")
+            await stage.action(job)
+    timings[stage.name] = time.monotonic() - start
+
+
+async def run_job_dag(job, stages, resources):
+    """Schedule every stage of job as soon as its dependencies are done. Returns the result record."""
+    start = time.monotonic()
+    result = dict(job, status="failed", error=None, iso_size=0, stages={})
+    if os.path.exists(job["workdir"]):
+        shutil.rmtree(job["workdir"])
+    os.makedirs(job["workdir"])
+
+    tasks = {}
+    for stage in stages:
+        deps = [tasks[name] for name in stage.after]
+        tasks[stage.name] = asyncio.ensure_future(run_stage(job, stage, deps, resources, result["stages"]))
+    try:
+        await asyncio.gather(*tasks.values())
+        result["status"] = "ok"
+        result["iso_size"] = os.path.getsize(job["iso_output"])
+        shutil.rmtree(job["workdir"], ignore_errors=True)
+    except Exception as e:
+        for task in tasks.values():
+            task.cancel()
+        result["error"] = str(e)
+    result["seconds"] = time.monotonic() - start
+    logger.info(f"[{job['index']}] {result['status']} in {result['seconds']:.1f}s")
+    return result
+
+
+async def run_jobs(jobs, cpu_slots, disk_slots, burn_drives):
+    resources = Resources(cpu_slots, disk_slots, burn_drives)
+    stages = job_stages(burn=bool(burn_drives))
+    return await asyncio.gather(*(run_job_dag(job, stages, resources) for job in jobs))
+
+
+def run_pipelined(file_paths, output_dir=".", cpu_slots=None, disk_slots=2, burn_drives=None, use_cache=True, workroot=BATCH_WORKROOT):
+    """
+    Build one ISO per input with stages from different jobs overlapping.
+    file_paths: List of input video paths
+    output_dir: Directory that receives the ISO files
+    cpu_slots: Concurrent ffmpeg encodes (defaults to half the CPU cores, ffmpeg is multi-threaded)
+    disk_slots: Concurrent dvdauthor/ISO mastering steps
+    burn_drives: DVD devices to burn every ISO to, one burn per drive at a time (None to skip burning)
+    use_cache: Reuse cached transcodes (see cache.py)
+    workroot: Parent directory of the per-job scratch directories
+
+    Returns the list of job results in input order.
+    """
+    if not file_paths:
+        logger.warning("Batch is empty, nothing to do.")
+        return []
+    os.environ["VIDEO_FORMAT"] = "NTSC"
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = plan_jobs(file_paths, output_dir, workroot=workroot, use_cache=use_cache)
+    cpu_slots = cpu_slots or max(1, (os.cpu_count() or 1) // 2)
+    burn_drives = burn_drives or []
+    logger.info(
+        f"Scheduling {len(jobs)} jobs: {cpu_slots} encode slots, {disk_slots} disk slots, {len(burn_drives)} burners"
+    )
+    start = time.monotonic()
+    results = asyncio.run(run_jobs(jobs, cpu_slots, disk_slots, burn_drives))
+    print_batch_summary(results, time.monotonic() - start)
+    return results
@@ -0,0 +1,139 @@
+"""
+Scratch storage for builds: where the workdirs live, how much space a build needs, and how the
+finished ISO reaches its destination.
+
+The workdirs go below --scratch-dir, or $SIMPLIFIED_DVD_SCRATCH, or the current directory.
+A tmpfs or a fast NVMe volume makes a good scratch location. Before encoding, the space needed is
+estimated from the input duration and bitrate. It is checked against every filesystem involved,
+so a full disk is reported up front instead of halfway through mastering.
+"""
+import errno
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SCRATCH_ENV = "SIMPLIFIED_DVD_SCRATCH"
+# ioctl that shares the extents of one file with another (btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+# Headroom on top of the estimate: IFO/BUP files, filesystem metadata, bitrate overshoot
+SPACE_MARGIN = 1.05
+# Errors from rename/FICLONE that mean "not possible here", rather than a real failure
+PLACE_FALLBACK_ERRNOS = (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EPERM)
+
+
+def scratch_path(name, scratch_dir=None):
+    """Absolute path of the scratch directory name inside scratch_dir ($SIMPLIFIED_DVD_SCRATCH or cwd by default)."""
+    return os.path.abspath(os.path.join(scratch_dir or os.environ.get(SCRATCH_ENV) or ".", name))
+
+
+def _existing_ancestor(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def free_bytes(path):
+    """Free space available for path (or for the nearest existing directory above it)."""
+    return shutil.disk_usage(_existing_ancestor(path)).free
+
+
+def same_filesystem(a, b):
+    """Whether a and b (or their nearest existing parents) are on the same filesystem."""
+    return os.stat(_existing_ancestor(a)).st_dev == os.stat(_existing_ancestor(b)).st_dev
+
+
+def estimate_build_space(mpeg_bytes, streaming=False, make_iso=True, iso_on_scratch=True):
+    """
+    Peak bytes a single-title build needs.
+    mpeg_bytes: Expected size of the program stream (see encoder.estimate_mpeg_bytes)
+    streaming: ffmpeg pipes into dvdauthor, so no output.mpg is written
+    make_iso: An ISO is mastered
+    iso_on_scratch: The ISO is mastered inside the workdir before being placed
+
+    Returns (scratch bytes, destination bytes).
+    """
+    # The split encode keeps the elementary streams until they are muxed into output.mpg
+    encode = 0 if streaming else 2 * mpeg_bytes
+    # output.mpg stays in the workdir (for --resume) next to the authored VOBs
+    authored = (0 if streaming else mpeg_bytes) + mpeg_bytes
+    iso = mpeg_bytes if make_iso else 0
+    scratch = max(encode, authored + (iso if iso_on_scratch else 0))
+    destination = 0 if iso_on_scratch else iso
+    return int(scratch * SPACE_MARGIN), int(destination * SPACE_MARGIN)
+
+
+def check_space(needs):
+    """
+    Check that every filesystem has room for what is written to it.
+    needs: (path, bytes) pairs; paths on the same filesystem are added up
+
+    Returns a list of (path, bytes needed, bytes free) for every filesystem that is too small.
+    """
+    by_device = {}
+    for path, size in needs:
+        if size <= 0:
+            continue
+        device = os.stat(_existing_ancestor(path)).st_dev
+        entry = by_device.setdefault(device, [path, 0])
+        entry[1] += size
+    shortfalls = []
+    for path, size in by_device.values():
+        free = free_bytes(path)
+        if size > free:
+            shortfalls.append((path, size, free))
+    return shortfalls
+
+
+def reflink(src, dst):
+    """Make dst a copy-on-write clone of src. Raises OSError where the filesystem cannot."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+
+def place_file(src, dst):
+    """
+    Move src to dst without copying data where possible: rename on the same filesystem, reflink
+    across mounts of a copy-on-write filesystem, and a plain copy only as the last resort.
+    dst appears atomically and complete.
+
+    Returns the method used: "rename", "reflink" or "copy".
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    try:
+        os.replace(src, dst)
+        return "rename"
+    except OSError as e:
+        if e.errno not in PLACE_FALLBACK_ERRNOS:
+            raise
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        reflink(src, tmp_path)
+        method = "reflink"
+    except OSError as e:
+        if e.errno not in PLACE_FALLBACK_ERRNOS:
+            raise
+        try:
+            shutil.copyfile(src, tmp_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        method = "copy"
+    os.replace(tmp_path, dst)
+    os.remove(src)
+    return method
@@ -0,0 +1,145 @@
+"""
+Spanning mode: split one long input across several discs.
+
+The split points are placed on source keyframes so that every part fits the target disc at the
+lowest acceptable bitrate; all parts then get the highest bitrate at which the longest one still fits.
+Each part is encoded straight from its time range: dvdauthor reads the program stream from an
+ffmpeg that seeks to the part's start, so the source is read once overall and no trimmed copies or
+output.mpg files are written. Every part is authored and mastered into its own ISO, and its workdir
+is removed before the next part starts, so scratch usage stays at one part per concurrent job.
+"""
+import math
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from discpack import DISC_RESERVE_BYTES, DISC_SIZES, MIN_VIDEO_BITRATE, fill_bitrate, title_bytes
+from encoder import DEFAULT_CHAPTER_INTERVAL, ffmpeg_dvd_stream_command, find_split_points, plan_chapters
+from isowriter import find_iso_tool, write_dvd_iso
+from linux import create_dvd_xml, dvdauthor_command, iso_command
+from metrics import PipelineMetrics, path_size
+from probe import get_duration, get_keyframes
+from scratch import SPACE_MARGIN, check_space, estimate_build_space
+
+SPAN_WORKROOT = "dvd_span"
+
+
+def plan_span(keyframes, duration, capacity):
+    """
+    Split [0, duration] into the fewest keyframe-aligned parts that each fit one disc.
+    keyframes: Source keyframe times in seconds
+    capacity: Disc size in bytes
+
+    Returns {"parts": [(start, end), ...], "video_bitrate": bits/s}; end is None for the last part.
+    Raises ValueError when the keyframes are too sparse to split the input finely enough.
+    """
+    usable = capacity - DISC_RESERVE_BYTES
+    parts = max(1, math.ceil(title_bytes(duration, MIN_VIDEO_BITRATE) / usable))
+    while True:
+        ranges = find_split_points(keyframes, duration, parts)
+        if len(ranges) < parts:
+            raise ValueError(f"Not enough keyframes to split the input into {parts} parts")
+        lengths = [(duration if end is None else end) - start for start, end in ranges]
+        # Snapping to keyframes can push a part over the disc; one more part shortens them all
+        if all(title_bytes(length, MIN_VIDEO_BITRATE) <= usable for length in lengths):
+            return {"parts": ranges, "video_bitrate": fill_bitrate([max(lengths)], capacity)}
+        parts += 1
+
+
+def build_part(file_path, start, end, duration, workdir, iso_output, capacity, video_bitrate, native_iso=False, chapters=None):
+    """
+    Author and master one part of file_path, encoding [start, end) on the fly.
+    duration: Length of the part in seconds
+    chapters: Chapter start times relative to the part, or None
+
+    Returns the ISO path.
+    """
+    if os.path.exists(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(os.path.join(workdir, "DVD"))
+    metrics = PipelineMetrics(os.path.splitext(iso_output)[0] + ".metrics.jsonl", job=os.path.basename(iso_output))
+    pipe_command = ffmpeg_dvd_stream_command(os.path.abspath(file_path), video_bitrate, start=start, end=end)
+    create_dvd_xml(os.path.join(workdir, "dvd.xml"), pipe_command=pipe_command, chapters=[chapters] if chapters else None)
+    try:
+        with metrics.stage("author", output_path=os.path.join(workdir, "DVD")):
+            subprocess.run(dvdauthor_command(), check=True, cwd=workdir)
+        authored = path_size(os.path.join(workdir, "DVD"))
+        if authored > capacity - DISC_RESERVE_BYTES:
+            logger.warning(f"{os.path.basename(iso_output)}: authored size {authored / 1e9:.2f} GB overshoots the disc")
+
+        iso_tool = None if native_iso else find_iso_tool()
+        with metrics.stage("master", output_path=iso_output):
+            if iso_tool:
+                subprocess.run(iso_command(iso_tool, iso_output), check=True, cwd=workdir)
+            else:
+                write_dvd_iso(os.path.join(workdir, "DVD"), iso_output)
+        metrics.summary()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    logger.info(f"Part {os.path.basename(iso_output)} ({duration / 60:.0f} min) is done.")
+    return iso_output
+
+
+def run_spanned(file_path, output_dir=".", disc_size="dvd5", jobs=1, native_iso=False, chapter_interval=DEFAULT_CHAPTER_INTERVAL, workroot=SPAN_WORKROOT):
+    """
+    Split file_path across as many discs as it needs and build one ISO per part.
+    output_dir: Directory that receives <name>_part01.iso, <name>_part02.iso, ...
+    disc_size: Key of DISC_SIZES
+    jobs: Number of parts built at once (each holds one part's worth of scratch space)
+    chapter_interval: Seconds between automatic chapter marks, 0 for none
+
+    Returns the list of ISO paths (None for parts that failed).
+    """
+    os.environ["VIDEO_FORMAT"] = "NTSC"
+    os.makedirs(output_dir, exist_ok=True)
+    capacity = DISC_SIZES[disc_size]
+    duration = get_duration(file_path)
+    keyframes = get_keyframes(file_path)
+    try:
+        plan = plan_span(keyframes, duration, capacity)
+    except ValueError as e:
+        logger.error(f"{e}.")
+        return []
+    parts, bitrate = plan["parts"], plan["video_bitrate"]
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    jobs = max(1, min(jobs, len(parts)))
+
+    logger.info(
+        f"Spanning {os.path.basename(file_path)} ({duration / 3600:.1f} h) across {len(parts)} {disc_size} disc(s) "
+        f"at {bitrate // 1000} kbit/s:"
+    )
+    lengths = [(duration if end is None else end) - start for start, end in parts]
+    for number, ((start, _), length) in enumerate(zip(parts, lengths), start=1):
+        logger.info(f"  part {number:02d}: from {start / 60:.1f} min, {length / 60:.0f} min, ~{title_bytes(length, bitrate) / 1e9:.2f} GB")
+
+    # Only the DVD folders of the parts in flight live in the scratch directory; the ISOs go to output_dir
+    scratch_bytes, _ = estimate_build_space(title_bytes(max(lengths), bitrate), streaming=True, iso_on_scratch=False)
+    iso_bytes = int(title_bytes(duration, bitrate) * SPACE_MARGIN)
+    shortfalls = check_space([(workroot, scratch_bytes * jobs), (output_dir, iso_bytes)])
+    for path, needed, free in shortfalls:
+        logger.error(f"Not enough space for {path}: about {needed / 1e9:.2f} GB needed, {free / 1e9:.2f} GB free.")
+    if shortfalls:
+        return []
+
+    def build(number):
+        (start, end), length = parts[number - 1], lengths[number - 1]
+        iso_output = os.path.abspath(os.path.join(output_dir, f"{stem}_part{number:02d}.iso"))
+        workdir = os.path.abspath(os.path.join(workroot, f"{stem}_part{number:02d}"))
+        part_keyframes = [k - start for k in keyframes if start <= k < (duration if end is None else end)]
+        chapters = plan_chapters(part_keyframes, length, interval=chapter_interval) if chapter_interval else None
+        logger.info(f"Building part {number}/{len(parts)}...")
+        try:
+            return build_part(file_path, start, end, length, workdir, iso_output, capacity, bitrate, native_iso, chapters)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Part {number} failed: {e}")
+            return None
+
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(build, range(1, len(parts) + 1)))
+    logger.info(f"{sum(1 for r in results if r)}/{len(parts)} parts built in {time.monotonic() - start_time:.0f}s")
+    return results
@@ -0,0 +1,23 @@
+import probe
+from span import plan_span
+
+
+def _fake_probe(monkeypatch, start_time, keyframes, duration):
+    info = {"format": {"start_time": f"{start_time:.6f}", "duration": f"{duration:.6f}"}, "streams": []}
+    packets = [[start_time + k, 1000, True] for k in keyframes]
+    monkeypatch.setattr(probe, "cached_probe", lambda path, kind, compute: info if kind == probe.PROBE_INFO else packets)
+
+
+def test_keyframes_are_relative_to_start_time(monkeypatch):
+    _fake_probe(monkeypatch, 40000.0, [0.0, 2.0, 4.0], 6.0)
+    assert probe.get_keyframes("rec.ts") == [0.0, 2.0, 4.0]
+    assert [p[0] for p in probe.get_video_packets("rec.ts")] == [0.0, 2.0, 4.0]
+
+
+def test_span_plan_with_offset_start_time(monkeypatch):
+    duration = 6 * 3600
+    _fake_probe(monkeypatch, 40000.0, [i * 2.0 for i in range(duration // 2)], duration)
+    plan = plan_span(probe.get_keyframes("rec.ts"), probe.get_duration("rec.ts"), 4_700_000_000)
+    assert len(plan["parts"]) == 2
+    assert plan["parts"][0][0] == 0.0
+    assert abs(plan["parts"][1][0] - duration / 2) <= 2.0
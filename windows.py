@@ -1,12 +1,14 @@
 import os
+import shlex
 import shutil
 import subprocess
 import sys
 
 from loguru import logger
 
-if sys.platform == "win32":
-    import wmi
+from encoder import dvd_encode_args
+from isowriter import write_dvd_iso
+from metrics import PipelineMetrics
 
 
 def try_native_or_wsl(cmd_native, cmd_wsl, check=True, env=None, allow_wsl=True, wsl_shared_dir=None):
@@ -26,7 +28,7 @@ def try_native_or_wsl(cmd_native, cmd_wsl, check=True, env=None, allow_wsl=True,
     subprocess.run(["wsl", "bash", "-c", cmd_wsl], check=check)
 
 
-def run_for_windows(burn, iso, burn_drive, iso_output, file_path, skip_burn=False):
+def run_for_windows(burn, iso, burn_drive, iso_output, file_path, skip_burn=False, workdir="dvd_workdir", native_iso=True, metrics_path=None, on_event=None):
     """
     burn: Boolean, whether to burn to DVD device
     iso: Path to DVD XML file (e.g., 'dvd.xml')
@@ -34,8 +36,13 @@ def run_for_windows(burn, iso, burn_drive, iso_output, file_path, skip_burn=Fals
     iso_output: Path for the output ISO file (e.g., 'dvd_image.iso')
     file_path: Path to input video file (e.g., 'input_video.mp4')
     skip_burn: If True, do not run isoburn.exe, just return info for burning
+    workdir: Scratch directory for this build, wiped at the start (one per concurrent job)
+    native_iso: Master the ISO with the built-in writer instead of genisoimage (avoids the WSL round-trip)
+    metrics_path: JSON lines file for per-stage timings (defaults to <iso name>.metrics.jsonl,
+        since the workdir is deleted at the end)
+    on_event: Optional callable receiving every metrics record (stage start/end)
     """
-    WORKDIR = "dvd_workdir"
+    WORKDIR = workdir
     OUTPUT_MPG = os.path.join(WORKDIR, "output.mpg")
     WSL_SHARED_DIR = os.path.abspath(WORKDIR).replace("\\", "/")
 
@@ -55,20 +62,23 @@ def run_for_windows(burn, iso, burn_drive, iso_output, file_path, skip_burn=Fals
         shutil.rmtree(WORKDIR)
     os.makedirs(WORKDIR)
 
+    if not metrics_path:
+        metrics_path = os.path.splitext(iso_output or "dvd.iso")[0] + ".metrics.jsonl"
+    metrics = PipelineMetrics(metrics_path, job=os.path.basename(file_path), listener=on_event)
+
     # Step 2: Convert video to NTSC DVD MPEG-2
     print("Converting video to NTSC DVD MPEG-2...")
+    encode_args = dvd_encode_args()
     ffmpeg_cmd = [
         "ffmpeg",
         "-i",
         file_path,
-        "-target",
-        "ntsc-dvd",
-        "-b:v",
-        "1800k",
+        *encode_args,
         OUTPUT_MPG,
     ]
-    ffmpeg_cmd_wsl = f"ffmpeg -i '{to_wsl_path(file_path)}' -target ntsc-dvd -b:v 1800k '{WSL_OUTPUT_MPG}'"
-    try_native_or_wsl(ffmpeg_cmd, ffmpeg_cmd_wsl, wsl_shared_dir=WSL_SHARED_DIR)
+    ffmpeg_cmd_wsl = f"ffmpeg -i '{to_wsl_path(file_path)}' {' '.join(shlex.quote(a) for a in encode_args)} '{WSL_OUTPUT_MPG}'"
+    with metrics.stage("encode", output_path=OUTPUT_MPG):
+        try_native_or_wsl(ffmpeg_cmd, ffmpeg_cmd_wsl, wsl_shared_dir=WSL_SHARED_DIR)
 
     # Step 3: Author DVD structure
     print("Authoring DVD structure...")
@@ -87,20 +97,26 @@ def run_for_windows(burn, iso, burn_drive, iso_output, file_path, skip_burn=Fals
     env = os.environ.copy()
     env["VIDEO_FORMAT"] = "NTSC"
     # Only run the WSL command for dvdauthor
-    try_native_or_wsl(None, dvdauthor_cmd_wsl, env=env, wsl_shared_dir=WSL_SHARED_DIR)
+    with metrics.stage("author", output_path=DVD_FOLDER):
+        try_native_or_wsl(None, dvdauthor_cmd_wsl, env=env, wsl_shared_dir=WSL_SHARED_DIR)
 
     # Step 4: Create ISO from DVD folder
     print("Creating ISO image...")
     if not iso_output:
         iso_output = "dvd.iso"
         print(f"No ISO output path specified. Defaulting to {iso_output}")
-    WSL_ISO_OUTPUT = to_wsl_path(iso_output)
-    genisoimage_cmd = ["genisoimage", "-o", iso_output, "-dvd-video", DVD_FOLDER]
-    genisoimage_cmd_wsl = f"genisoimage -o '{WSL_ISO_OUTPUT}' -dvd-video '{WSL_DVD_FOLDER}'"
-    try_native_or_wsl(genisoimage_cmd, genisoimage_cmd_wsl, wsl_shared_dir=WSL_SHARED_DIR)
+    with metrics.stage("master", output_path=iso_output):
+        if native_iso:
+            write_dvd_iso(DVD_FOLDER, iso_output)
+        else:
+            WSL_ISO_OUTPUT = to_wsl_path(iso_output)
+            genisoimage_cmd = ["genisoimage", "-o", iso_output, "-dvd-video", DVD_FOLDER]
+            genisoimage_cmd_wsl = f"genisoimage -o '{WSL_ISO_OUTPUT}' -dvd-video '{WSL_DVD_FOLDER}'"
+            try_native_or_wsl(genisoimage_cmd, genisoimage_cmd_wsl, wsl_shared_dir=WSL_SHARED_DIR)
 
     # Step 5: Burn ISO to DVD if device is specified
     if skip_burn:
+        metrics.summary()
         # Return info needed for burning
         result = {
             "iso_output": os.path.abspath(iso_output),
@@ -118,21 +134,24 @@ def run_for_windows(burn, iso, burn_drive, iso_output, file_path, skip_burn=Fals
         # Use isoburn.exe directly, do not fallback to WSL
         isoburn_cmd = ["isoburn.exe", "/q", burn_drive, os.path.abspath(iso_output)]
         try:
-            subprocess.run(isoburn_cmd, check=True)
+            with metrics.stage("burn", output_path=iso_output):
+                subprocess.run(isoburn_cmd, check=True)
             print("DVD creation and burning complete.")
         except Exception as e:
             print(f"Error running isoburn.exe: {e}")
     else:
         print(f"No DVD device specified, skipping burn. DVD ISO is at {iso_output}.")
+    metrics.summary()
     # Cleanup workdir after all processing is done
     if os.path.exists(WORKDIR):
         try:
             shutil.rmtree(WORKDIR)
         except Exception as e:
             print(f"Warning: Could not delete workdir {WORKDIR}: {e}")
+    return os.path.abspath(iso_output)
 
 
-def run_isoburn_step(iso_output, burn_drive):
+def run_isoburn_step(iso_output, burn_drive, workdir="dvd_workdir"):
     """Run the isoburn.exe step only."""
     isoburn_cmd = ["isoburn.exe", "/q", burn_drive, os.path.abspath(iso_output)]
     try:
@@ -141,7 +160,6 @@ def run_isoburn_step(iso_output, burn_drive):
     except Exception as e:
         print(f"Error running isoburn.exe: {e}")
     # Cleanup workdir after burning
-    workdir = "dvd_workdir"
     if os.path.exists(workdir):
         try:
             shutil.rmtree(workdir)